@@ -48,7 +48,7 @@ print_message "Checking for required commands..."
 MISSING_COMMANDS=()
 
 # Check for basic commands
-for cmd in bash ps top df du find grep awk sort head tail; do
+for cmd in bash python3 ps top df du find grep awk sort head tail; do
     if ! command -v $cmd &> /dev/null; then
         MISSING_COMMANDS+=($cmd)
     fi
@@ -56,7 +56,7 @@ done
 
 # Check for optional commands
 OPTIONAL_MISSING=()
-for cmd in fdupes iftop nethogs tcpdump; do
+for cmd in iftop nethogs tcpdump; do
     if ! command -v $cmd &> /dev/null; then
         OPTIONAL_MISSING+=($cmd)
     fi
@@ -6,11 +6,15 @@
 # Date: $(date +%Y-%m-%d)
 # Description: This script analyzes disk usage and helps identify large files and directories
 
+# Set script directory
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
 # Configuration
 LOG_DIR="../logs"
 DATA_DIR="../data"
 TIMESTAMP=$(date +"%Y-%m-%d_%H-%M-%S")
 DISK_LOG="$DATA_DIR/disk_analysis_$TIMESTAMP.log"
+DISK_INDEX="$SCRIPT_DIR/disk_index.py"
 
 # Create directories if they don't exist
 mkdir -p $LOG_DIR
@@ -55,7 +59,7 @@ find_largest_directories() {
     log_message "Finding $limit largest directories in $path..."
     
     echo "=== $limit LARGEST DIRECTORIES IN $path ==="
-    du -h "$path" 2>/dev/null | sort -rh | head -n "$limit"
+    python3 "$DISK_INDEX" dirs "$path" "$limit"
     
     return 0
 }
@@ -73,7 +77,7 @@ find_largest_files() {
     log_message "Finding $limit largest files in $path..."
     
     echo "=== $limit LARGEST FILES IN $path ==="
-    find "$path" -type f -exec du -h {} \; 2>/dev/null | sort -rh | head -n "$limit"
+    python3 "$DISK_INDEX" files "$path" "$limit"
     
     return 0
 }
@@ -97,7 +101,7 @@ find_files_larger_than() {
     log_message "Finding files larger than $size in $path..."
     
     echo "=== FILES LARGER THAN $size IN $path ==="
-    find "$path" -type f -size +"$size" -exec ls -lh {} \; 2>/dev/null | sort -k5 -rh
+    python3 "$DISK_INDEX" larger-than "$size" "$path"
     
     return 0
 }
@@ -121,7 +125,7 @@ find_old_files() {
     log_message "Finding files older than $days days in $path..."
     
     echo "=== FILES OLDER THAN $days DAYS IN $path (TOP $limit) ==="
-    find "$path" -type f -mtime +"$days" -exec ls -lth {} \; 2>/dev/null | head -n "$limit"
+    python3 "$DISK_INDEX" old "$days" "$path" "$limit"
     
     return 0
 }
@@ -145,7 +149,7 @@ find_recent_files() {
     log_message "Finding files modified in the last $days days in $path..."
     
     echo "=== FILES MODIFIED IN THE LAST $days DAYS IN $path (TOP $limit) ==="
-    find "$path" -type f -mtime -"$days" -exec ls -lth {} \; 2>/dev/null | head -n "$limit"
+    python3 "$DISK_INDEX" recent "$days" "$path" "$limit"
     
     return 0
 }
@@ -161,12 +165,8 @@ find_duplicate_files() {
     log_message "Finding duplicate files in $path..."
     
     echo "=== DUPLICATE FILES IN $path ==="
-    if command -v fdupes &> /dev/null; then
-        fdupes -r "$path"
-    else
-        echo "The fdupes command is not available. Please install it to find duplicate files."
-        return 1
-    fi
+    # Files are grouped by size from the index, then compared by hash
+    python3 "$DISK_INDEX" duplicates "$path"
     
     return 0
 }
@@ -182,41 +182,22 @@ analyze_by_file_type() {
     log_message "Analyzing disk usage by file type in $path..."
     
     echo "=== DISK USAGE BY FILE TYPE IN $path ==="
-    echo "This may take a while for large directories..."
-    
-    # Create a temporary file to store results
-    temp_file=$(mktemp)
-    
-    # Find all files and extract extensions
-    find "$path" -type f | while read -r file; do
-        # Get file extension
-        ext="${file##*.}"
-        if [ "$ext" = "$file" ]; then
-            ext="no_extension"
-        fi
-        
-        # Get file size in bytes
-        size=$(stat -c %s "$file" 2>/dev/null)
-        
-        # Write extension and size to temp file
-        echo "$ext $size" >> "$temp_file"
-    done
-    
-    # Sum up sizes by extension and sort
-    echo "Extension | Size | Count"
-    echo "---------|------|------"
-    awk '{
-        ext[$1] += $2;
-        count[$1]++;
-    }
-    END {
-        for (e in ext) {
-            printf "%s | %.2f MB | %d\n", e, ext[e]/(1024*1024), count[e];
-        }
-    }' "$temp_file" | sort -k3 -rn
-    
-    # Remove temporary file
-    rm "$temp_file"
+    python3 "$DISK_INDEX" by-type "$path"
+    
+    return 0
+}
+
+# Function to rebuild the disk index
+rebuild_index() {
+    if [ -z "$1" ]; then
+        path="/"
+    else
+        path="$1"
+    fi
+    
+    log_message "Rebuilding disk index for $path..."
+    
+    python3 "$DISK_INDEX" build "$path"
     
     return 0
 }
@@ -300,8 +281,11 @@ main() {
         full)
             full_disk_analysis "$2"
             ;;
+        index)
+            rebuild_index "$2"
+            ;;
         *)
-            echo "Usage: $0 {usage|inodes|dirs|files|larger-than|old|recent|duplicates|by-type|full} [ARGS]"
+            echo "Usage: $0 {usage|inodes|dirs|files|larger-than|old|recent|duplicates|by-type|full|index} [ARGS]"
             echo
             echo "Commands:"
             echo "  usage                    Show disk usage"
@@ -311,9 +295,13 @@ main() {
             echo "  larger-than SIZE [PATH]  Find files larger than SIZE (e.g., 100M)"
             echo "  old [DAYS] [PATH] [LIMIT] Find files older than DAYS days (default: 30 days, / and top 20)"
             echo "  recent [DAYS] [PATH] [LIMIT] Find files modified in the last DAYS days (default: 1 day, / and top 20)"
-            echo "  duplicates [PATH]        Find duplicate files (requires fdupes)"
+            echo "  duplicates [PATH]        Find duplicate files"
             echo "  by-type [PATH]           Analyze disk usage by file type"
             echo "  full [PATH]              Perform full disk analysis (default: /)"
+            echo "  index [PATH]             Rebuild the disk index (default: /)"
+            echo
+            echo "Directory and file queries are answered from an index in the data directory, which is"
+            echo "refreshed incrementally when it is older than DISK_INDEX_MAX_AGE seconds (default: 600)."
             exit 1
             ;;
     esac
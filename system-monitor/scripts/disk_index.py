@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+#
+# disk_index.py - Cached disk usage index for the disk analyzer
+#
+# Author: Your Name
+# Date: 2023-01-01
+# Description: This script indexes a directory tree with one parallel scandir
+#              walk and answers disk usage queries (largest directories and
+#              files, size and age filters, duplicates) from the index.
+#
+# The index is a SQLite database (data/disk_index.db) holding per-directory
+# aggregated sizes and per-file metadata. A refresh only rescans directories
+# whose mtime changed since they were indexed, which catches files being
+# created, removed or renamed. Files modified in place keep their indexed
+# size until their directory is rescanned or the index is rebuilt. Like du,
+# files with several hard links are counted once per inode.
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Set paths
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), "data")
+INDEX_FILE = os.path.join(DATA_DIR, "disk_index.db")
+
+# Pseudo filesystems that are never indexed
+EXCLUDE_DIRS = ("/proc", "/sys", "/dev")
+
+# Refresh the index before a query if it is older than this (seconds)
+MAX_AGE = int(os.environ.get("DISK_INDEX_MAX_AGE", 600))
+
+# Number of directories scanned in parallel
+WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Bytes read to pre-filter duplicate candidates before hashing them fully
+PARTIAL_HASH_SIZE = 64 * 1024
+
+# Size suffixes accepted by larger-than, as used by find -size
+SIZE_UNITS = {"c": 1, "b": 512, "k": 1024, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+# Index database format version, older databases are rebuilt
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (path TEXT PRIMARY KEY, updated REAL);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY, parent TEXT, mtime REAL,
+    own_size INTEGER, own_usage INTEGER, total_size INTEGER, total_usage INTEGER
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, dir TEXT, size INTEGER, usage INTEGER, mtime REAL, hash TEXT,
+    dev INTEGER, ino INTEGER, nlink INTEGER
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE INDEX IF NOT EXISTS dirs_usage ON dirs (total_usage);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+CREATE INDEX IF NOT EXISTS files_size ON files (size);
+CREATE INDEX IF NOT EXISTS files_mtime ON files (mtime);
+"""
+
+
+def open_index(path=INDEX_FILE):
+    """Open the index database, creating it if needed."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        conn.executescript("DROP TABLE IF EXISTS roots; DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS files;")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def path_range(path):
+    """Return (low, high) bounds matching every path below path."""
+    prefix = path.rstrip("/") + "/"
+    return prefix, prefix[:-1] + "0"
+
+
+def scan_directory(path):
+    """Read one directory; return (stat, files, subdirs) or None if unreadable."""
+    try:
+        # Stat before listing so changes made during the scan trigger a rescan
+        dir_stat = os.stat(path)
+        files = []
+        subdirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path not in EXCLUDE_DIRS:
+                            subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        files.append((entry.path, st.st_size, st.st_blocks * 512, st.st_mtime,
+                                      st.st_dev, st.st_ino, st.st_nlink))
+                except OSError:
+                    continue
+        return dir_stat, files, subdirs
+    except OSError:
+        return None
+
+
+def check_directory(path, indexed_mtime, indexed_subdirs):
+    """Rescan a directory only if its mtime changed since it was indexed."""
+    if indexed_mtime is not None:
+        try:
+            if os.stat(path).st_mtime == indexed_mtime:
+                return path, None, indexed_subdirs
+        except OSError:
+            return path, None, None
+    result = scan_directory(path)
+    if result is None:
+        return path, None, None
+    return path, result, result[2]
+
+
+def store_directory(conn, path, dir_stat, files):
+    """Replace the indexed contents of one directory."""
+    # Keep cached hashes of files that did not change
+    hashes = {
+        row[0]: row[1:]
+        for row in conn.execute("SELECT path, size, mtime, hash FROM files WHERE dir = ? AND hash IS NOT NULL", (path,))
+    }
+    rows = []
+    for file_path, size, usage, file_mtime, dev, ino, nlink in files:
+        cached = hashes.get(file_path)
+        file_hash = cached[2] if cached and cached[:2] == (size, file_mtime) else None
+        rows.append((file_path, path, size, usage, file_mtime, file_hash, dev, ino, nlink))
+
+    # Hard linked files are added once per inode when sizes are aggregated
+    single = [row for row in rows if row[8] == 1]
+    conn.execute("DELETE FROM files WHERE dir = ?", (path,))
+    conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.execute(
+        "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, 0, 0)",
+        (path, os.path.dirname(path), dir_stat.st_mtime,
+         sum(row[2] for row in single), dir_stat.st_blocks * 512 + sum(row[3] for row in single)))
+
+
+def update_index(conn, root, full=False):
+    """Build or refresh the index of root; return the number of directories rescanned."""
+    root = os.path.abspath(root)
+    low, high = path_range(root)
+    known = {}
+    children = {}
+    for path, parent, mtime in conn.execute(
+            "SELECT path, parent, mtime FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+            (root, low, high)):
+        # A full build rescans every directory but keeps cached file hashes
+        known[path] = None if full else mtime
+        children.setdefault(parent, []).append(path)
+
+    # Walk the tree in parallel, writing results from this thread only
+    visited = set()
+    rescanned = 0
+    with ThreadPoolExecutor(WORKERS) as pool:
+        pending = {pool.submit(check_directory, root, known.get(root), children.get(root, []))}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, result, subdirs = future.result()
+                if subdirs is None:
+                    continue
+                visited.add(path)
+                if result is not None:
+                    store_directory(conn, path, result[0], result[1])
+                    rescanned += 1
+                for subdir in subdirs:
+                    pending.add(pool.submit(check_directory, subdir, known.get(subdir), children.get(subdir, [])))
+
+    # Forget directories that no longer exist
+    removed = [(path,) for path in known if path not in visited]
+    conn.executemany("DELETE FROM files WHERE dir = ?", removed)
+    conn.executemany("DELETE FROM dirs WHERE path = ?", removed)
+
+    # Indexes of subdirectories are now part of this one
+    conn.execute("DELETE FROM roots WHERE path >= ? AND path < ?", (low, high))
+
+    ancestor = indexed_root(conn, root)
+    if ancestor is not None and ancestor != root:
+        # The directories above root belong to an enclosing index, whose
+        # totals include the rescanned subtree
+        aggregate_sizes(conn, ancestor)
+    else:
+        aggregate_sizes(conn, root)
+        conn.execute("INSERT OR REPLACE INTO roots VALUES (?, ?)", (root, time.time()))
+    conn.commit()
+    return rescanned
+
+
+def aggregate_sizes(conn, root):
+    """Recompute the total size of every directory below root."""
+    low, high = path_range(root)
+    rows = conn.execute(
+        "SELECT path, parent, own_size, own_usage FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+        (root, low, high)).fetchall()
+
+    totals = {path: [size, usage] for path, _, size, usage in rows}
+
+    # Count each hard linked inode once, in the directory of its first path
+    seen = set()
+    for dir_path, size, usage, dev, ino in conn.execute(
+            "SELECT dir, size, usage, dev, ino FROM files WHERE nlink > 1 AND path >= ? AND path < ? "
+            "ORDER BY path", (low, high)):
+        if (dev, ino) in seen or dir_path not in totals:
+            continue
+        seen.add((dev, ino))
+        totals[dir_path][0] += size
+        totals[dir_path][1] += usage
+
+    # Add each directory to its parent, deepest directories first
+    rows.sort(key=lambda row: row[0].count("/"), reverse=True)
+    for path, parent, _, _ in rows:
+        if path != root and parent in totals:
+            totals[parent][0] += totals[path][0]
+            totals[parent][1] += totals[path][1]
+
+    conn.executemany("UPDATE dirs SET total_size = ?, total_usage = ? WHERE path = ?",
+                     [(size, usage, path) for path, (size, usage) in totals.items()])
+
+
+def indexed_root(conn, path):
+    """Return the indexed root covering path, or None."""
+    for root, in conn.execute("SELECT path FROM roots"):
+        if path == root or path.startswith(path_range(root)[0]):
+            return root
+    return None
+
+
+def ensure_index(conn, path, max_age=MAX_AGE):
+    """Make sure path is covered by a sufficiently recent index."""
+    path = os.path.abspath(path)
+    root = indexed_root(conn, path)
+    if root is None:
+        update_index(conn, path, full=True)
+        return
+    updated, = conn.execute("SELECT updated FROM roots WHERE path = ?", (root,)).fetchone()
+    if time.time() - updated > max_age:
+        update_index(conn, root)
+
+
+def largest_directories(conn, path, limit=10):
+    """Return [(usage, path), ...] for the largest directories below path."""
+    low, high = path_range(path)
+    return conn.execute(
+        "SELECT total_usage, path FROM dirs WHERE path = ? OR (path >= ? AND path < ?) "
+        "ORDER BY total_usage DESC LIMIT ?", (path, low, high, limit)).fetchall()
+
+
+def largest_files(conn, path, limit=10):
+    """Return [(size, mtime, path), ...] for the largest files below path."""
+    low, high = path_range(path)
+    return conn.execute(
+        "SELECT size, mtime, path FROM files WHERE path >= ? AND path < ? "
+        "ORDER BY size DESC LIMIT ?", (low, high, limit)).fetchall()
+
+
+def files_larger_than(conn, path, size):
+    """Return [(size, mtime, path), ...] for files larger than size bytes."""
+    low, high = path_range(path)
+    return conn.execute(
+        "SELECT size, mtime, path FROM files WHERE size > ? AND path >= ? AND path < ? "
+        "ORDER BY size DESC", (size, low, high)).fetchall()
+
+
+def old_files(conn, path, days, limit=20):
+    """Return [(size, mtime, path), ...] for files not modified in days, oldest first."""
+    low, high = path_range(path)
+    return conn.execute(
+        "SELECT size, mtime, path FROM files WHERE mtime < ? AND path >= ? AND path < ? "
+        "ORDER BY mtime LIMIT ?", (time.time() - days * 86400, low, high, limit)).fetchall()
+
+
+def recent_files(conn, path, days, limit=20):
+    """Return [(size, mtime, path), ...] for files modified in days, newest first."""
+    low, high = path_range(path)
+    return conn.execute(
+        "SELECT size, mtime, path FROM files WHERE mtime > ? AND path >= ? AND path < ? "
+        "ORDER BY mtime DESC LIMIT ?", (time.time() - days * 86400, low, high, limit)).fetchall()
+
+
+def usage_by_type(conn, path):
+    """Return [(extension, size, count), ...] sorted by count."""
+    low, high = path_range(path)
+    totals = {}
+    for file_path, size in conn.execute(
+            "SELECT path, size FROM files WHERE path >= ? AND path < ?", (low, high)):
+        name = os.path.basename(file_path)
+        extension = name.rsplit(".", 1)[1] if "." in name else "no_extension"
+        total = totals.setdefault(extension, [0, 0])
+        total[0] += size
+        total[1] += 1
+    return sorted(((ext, size, count) for ext, (size, count) in totals.items()),
+                  key=lambda row: row[2], reverse=True)
+
+
+def hash_file(path, limit=None):
+    """Return the SHA-256 of a file, or of its first limit bytes."""
+    digest = hashlib.sha256()
+    remaining = limit
+    with open(path, "rb") as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(1024 * 1024 if remaining is None else min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def group_by(items, key):
+    """Group items by key, keeping only groups with more than one item."""
+    groups = {}
+    for item in items:
+        try:
+            groups.setdefault(key(item), []).append(item)
+        except OSError:
+            continue
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def duplicate_files(conn, path):
+    """Return [(size, [path, ...]), ...] for sets of identical files below path."""
+    low, high = path_range(path)
+    sizes = [row[0] for row in conn.execute(
+        "SELECT size FROM files WHERE size > 0 AND path >= ? AND path < ? "
+        "GROUP BY size HAVING COUNT(DISTINCT ino) > 1 OR COUNT(DISTINCT dev) > 1 "
+        "ORDER BY size DESC", (low, high))]
+
+    duplicates = []
+    for size in sizes:
+        # Hard links to the same inode are one file, as in fdupes
+        inodes = {}
+        for file_path, file_hash, dev, ino in conn.execute(
+                "SELECT path, hash, dev, ino FROM files WHERE size = ? AND path >= ? AND path < ? "
+                "ORDER BY path", (size, low, high)):
+            inodes.setdefault((dev, ino), (file_path, file_hash))
+        candidates = list(inodes.values())
+        if len(candidates) < 2:
+            continue
+
+        # Cheap check on the first bytes before hashing whole files
+        if size > PARTIAL_HASH_SIZE and not all(item[1] for item in candidates):
+            candidates = [item for group in group_by(
+                candidates, lambda item: hash_file(item[0], PARTIAL_HASH_SIZE))
+                for item in group]
+
+        hashed = []
+        for file_path, file_hash in candidates:
+            if file_hash is None:
+                try:
+                    file_hash = hash_file(file_path)
+                except OSError:
+                    continue
+                conn.execute("UPDATE files SET hash = ? WHERE path = ?", (file_hash, file_path))
+            hashed.append((file_path, file_hash))
+
+        for group in group_by(hashed, lambda item: item[1]):
+            duplicates.append((size, sorted(item[0] for item in group)))
+
+    conn.commit()
+    return duplicates
+
+
+def format_size(size):
+    """Format a size in bytes like du -h."""
+    for unit in ("", "K", "M", "G", "T"):
+        if size < 1024 or unit == "T":
+            break
+        size /= 1024
+    if unit == "":
+        return str(int(size))
+    return f"{size:.1f}{unit}" if size < 10 else f"{size:.0f}{unit}"
+
+
+def parse_size(text):
+    """Parse a find -size style size (e.g. 100M) into bytes."""
+    if text[-1:] in SIZE_UNITS:
+        return int(text[:-1]) * SIZE_UNITS[text[-1]]
+    return int(text) * 512
+
+
+def print_files(rows):
+    """Print file rows as 'SIZE  MODIFIED  PATH'."""
+    for size, mtime, path in rows:
+        modified = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M")
+        print(f"{format_size(size)}\t{modified}\t{path}")
+
+
+def display_help():
+    """Print command line usage."""
+    print("Disk usage index for the System Monitoring and Management Tool")
+    print(f"Usage: {sys.argv[0]} [COMMAND] [ARGS]")
+    print()
+    print("Commands:")
+    print("  build PATH                  Index PATH from scratch")
+    print("  refresh PATH                Rescan directories of PATH that changed")
+    print("  dirs PATH LIMIT             Largest directories")
+    print("  files PATH LIMIT            Largest files")
+    print("  larger-than SIZE PATH       Files larger than SIZE (e.g. 100M)")
+    print("  old DAYS PATH LIMIT         Files older than DAYS days")
+    print("  recent DAYS PATH LIMIT      Files modified in the last DAYS days")
+    print("  duplicates PATH             Identical files")
+    print("  by-type PATH                Disk usage by file extension")
+    print()
+    print("Queries refresh the index first if it is older than DISK_INDEX_MAX_AGE seconds (default: 600).")
+
+
+def main(argv):
+    """Run the command line interface."""
+    if len(argv) < 3:
+        display_help()
+        return 1
+
+    command, args = argv[1], argv[2:]
+    path_arg = {"larger-than": 1, "old": 1, "recent": 1}.get(command, 0)
+    if len(args) <= path_arg:
+        display_help()
+        return 1
+    path = os.path.abspath(args[path_arg])
+
+    try:
+        conn = open_index()
+        if command == "build":
+            start = time.time()
+            count = update_index(conn, path, full=True)
+            print(f"Indexed {count} directories in {time.time() - start:.1f}s")
+            return 0
+        elif command == "refresh":
+            ensure_index(conn, path, max_age=0)
+            return 0
+
+        ensure_index(conn, path)
+        if command == "dirs":
+            for usage, dir_path in largest_directories(conn, path, int(args[1])):
+                print(f"{format_size(usage)}\t{dir_path}")
+        elif command == "files":
+            print_files(largest_files(conn, path, int(args[1])))
+        elif command == "larger-than":
+            print_files(files_larger_than(conn, path, parse_size(args[0])))
+        elif command == "old":
+            print_files(old_files(conn, path, int(args[0]), int(args[2])))
+        elif command == "recent":
+            print_files(recent_files(conn, path, int(args[0]), int(args[2])))
+        elif command == "duplicates":
+            for size, paths in duplicate_files(conn, path):
+                print(f"{format_size(size)} each:")
+                for file_path in paths:
+                    print(f"  {file_path}")
+                print()
+        elif command == "by-type":
+            print("Extension | Size | Count")
+            print("---------|------|------")
+            for extension, size, count in usage_by_type(conn, path):
+                print(f"{extension} | {size / (1024 * 1024):.2f} MB | {count}")
+        else:
+            display_help()
+            return 1
+    except (OSError, ValueError, IndexError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
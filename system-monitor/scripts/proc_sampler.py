@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+#
+# proc_sampler.py - Low-overhead process sampler based on /proc
+#
+# Author: Your Name
+# Date: 2023-01-01
+# Description: This script samples all processes in a single pass over
+#              /proc/[pid]/stat and /proc/[pid]/status and computes the CPU
+#              usage of each process over the interval between two samples
+#              (unlike `ps %cpu`, which is an average over the process lifetime).
+#
+# Between samples only (starttime, cpu ticks) is kept per PID. The table is
+# rebuilt on every sample, so exited processes are evicted automatically and
+# a reused PID is recognised by its different start time. A previous sample
+# older than MAX_BASELINE_AGE seconds is not used, as CPU usage over such a
+# long interval would hide recent activity like `ps %cpu` does.
+
+import os
+import sys
+import json
+import time
+import heapq
+import pwd
+from collections import namedtuple
+
+# Clock ticks per second used by the kernel for CPU times
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+# Page size used for the resident set size in /proc/[pid]/stat
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+# Interval used when there is no previous sample to compare with
+DEFAULT_INTERVAL = 1.0
+
+# Oldest previous sample that CPU usage is computed against (seconds)
+MAX_BASELINE_AGE = float(os.environ.get("PROC_SAMPLER_MAX_AGE", 300))
+
+# One sampled process
+Process = namedtuple("Process", ["pid", "ppid", "user", "state", "command", "cpu", "rss", "mem"])
+
+
+def read_mem_total(proc_dir="/proc"):
+    """Return the total memory in bytes."""
+    try:
+        with open(os.path.join(proc_dir, "meminfo"), "rb") as f:
+            for line in f:
+                if line.startswith(b"MemTotal:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+class ProcessSampler:
+    """Samples processes and tracks CPU ticks between samples."""
+
+    def __init__(self, proc_dir="/proc", max_age=MAX_BASELINE_AGE):
+        self.proc_dir = proc_dir
+        self.max_age = max_age
+        self.mem_total = read_mem_total(proc_dir)
+        self.previous = {}
+        self.previous_time = None
+        self.interval = 0.0
+        self.processes = []
+        self.users = {}
+
+    @property
+    def has_baseline(self):
+        """Check if a recent enough previous sample exists to compute CPU usage against."""
+        return self.previous_time is not None and time.monotonic() - self.previous_time <= self.max_age
+
+    def user_name(self, uid):
+        """Return the user name for a uid, caching lookups."""
+        name = self.users.get(uid)
+        if name is None:
+            try:
+                name = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                name = str(uid)
+            self.users[uid] = name
+        return name
+
+    def read_process(self, pid):
+        """Read one process; return (starttime, ticks, fields) or None if it exited."""
+        base = os.path.join(self.proc_dir, pid)
+        try:
+            with open(base + "/stat", "rb") as f:
+                stat = f.read()
+            with open(base + "/status", "rb") as f:
+                status = f.read()
+        except OSError:
+            return None
+
+        # The command name may contain spaces and parentheses
+        end = stat.rfind(b")")
+        command = stat[stat.find(b"(") + 1:end].decode(errors="replace")
+        fields = stat[end + 2:].split()
+
+        # Fields are numbered from 3 (state) as in proc(5)
+        state = fields[0].decode()
+        ppid = int(fields[1])
+        ticks = int(fields[11]) + int(fields[12])
+        starttime = int(fields[19])
+        rss = int(fields[21]) * PAGE_SIZE
+
+        uid = 0
+        start = status.find(b"\nUid:")
+        if start >= 0:
+            uid = int(status[start + 5:status.find(b"\n", start + 1)].split()[0])
+
+        return starttime, ticks, (int(pid), ppid, uid, state, command, rss)
+
+    def sample(self, min_interval=0.0):
+        """Take a sample of all processes; return a list of Process records."""
+        # CPU usage over very short intervals is too coarse, reuse the last sample
+        now = time.monotonic()
+        has_baseline = self.has_baseline
+        if has_baseline and now - self.previous_time < min_interval:
+            return self.processes
+        interval = now - self.previous_time if has_baseline else 0.0
+        current = {}
+        processes = []
+
+        for pid in os.listdir(self.proc_dir):
+            if not pid.isdigit():
+                continue
+            result = self.read_process(pid)
+            if result is None:
+                continue
+            starttime, ticks, (pid_number, ppid, uid, state, command, rss) = result
+            current[pid_number] = (starttime, ticks)
+
+            # Compare with the previous sample of the same process instance
+            cpu = 0.0
+            previous = self.previous.get(pid_number)
+            if interval > 0:
+                if previous and previous[0] == starttime:
+                    delta = ticks - previous[1]
+                else:
+                    delta = ticks
+                cpu = delta / CLOCK_TICKS / interval * 100
+
+            mem = rss * 100 / self.mem_total if self.mem_total else 0.0
+            processes.append(Process(pid_number, ppid, self.user_name(uid), state,
+                                     command, round(cpu, 1), rss, round(mem, 1)))
+
+        # Replacing the table evicts processes that have exited
+        self.previous = current
+        self.previous_time = now
+        self.interval = interval
+        self.processes = processes
+        return processes
+
+    def save(self, path):
+        """Persist the per-PID state so a later run can compute CPU deltas."""
+        state = {
+            "boot_id": boot_id(self.proc_dir),
+            "time": self.previous_time,
+            "processes": self.previous,
+        }
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    def load(self, path):
+        """Restore per-PID state saved by an earlier run, if still valid."""
+        try:
+            with open(path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        # Monotonic time and PIDs are only comparable within the same boot
+        if state.get("boot_id") != boot_id(self.proc_dir):
+            return False
+        self.previous = {int(pid): tuple(values) for pid, values in state["processes"].items()}
+        self.previous_time = state["time"]
+        return self.has_baseline
+
+
+def boot_id(proc_dir="/proc"):
+    """Return the kernel boot id."""
+    try:
+        with open(os.path.join(proc_dir, "sys/kernel/random/boot_id"), "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def top_processes(processes, key="cpu", limit=10):
+    """Return the top processes by CPU usage or resident memory."""
+    return heapq.nlargest(limit, processes, key=lambda process: getattr(process, key))
+
+
+def zombie_processes(processes):
+    """Return the zombie processes."""
+    return [process for process in processes if process.state == "Z"]
+
+
+def benchmark(iterations=20):
+    """Measure the sampling cost; return (processes, milliseconds per 1000 processes)."""
+    sampler = ProcessSampler()
+    sampler.sample()
+
+    count = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        count += len(sampler.sample())
+    elapsed = time.perf_counter() - start
+
+    return count // iterations, elapsed * 1000 / count * 1000 if count else 0.0
+
+
+def print_report(processes, cpu_threshold, mem_threshold):
+    """Print processes over the thresholds and zombies as 'KIND PID USER VALUE STATE COMMAND'."""
+    for process in sorted(processes, key=lambda process: -process.cpu):
+        if process.cpu > cpu_threshold:
+            print(f"CPU {process.pid} {process.user} {process.cpu} {process.state} {process.command}")
+    for process in sorted(processes, key=lambda process: -process.mem):
+        if process.mem > mem_threshold:
+            print(f"MEM {process.pid} {process.user} {process.mem} {process.state} {process.command}")
+    for process in zombie_processes(processes):
+        print(f"ZOMBIE {process.pid} {process.user} {process.ppid} {process.state} {process.command}")
+
+
+def display_help():
+    """Print command line usage."""
+    print("Process sampler for the System Monitoring and Management Tool")
+    print(f"Usage: {sys.argv[0]} [COMMAND]")
+    print()
+    print("Commands:")
+    print("  report CPU MEM [STATE]  Print processes above CPU/MEM percent and zombies,")
+    print("                          using CPU usage since the sample saved in STATE")
+    print("  top [cpu|rss] [LIMIT]   Print the top processes over a 1 second interval")
+    print("  benchmark [ITERATIONS]  Measure the sampling cost")
+    print()
+
+
+def main(argv):
+    """Run the command line interface."""
+    command = argv[1] if len(argv) > 1 else "help"
+    sampler = ProcessSampler()
+
+    try:
+        if command == "report" and len(argv) in (4, 5):
+            state_file = argv[4] if len(argv) == 5 else None
+            if not (state_file and sampler.load(state_file)):
+                sampler.sample()
+            # Measure over at least DEFAULT_INTERVAL, even after a very recent run
+            time.sleep(max(0.0, DEFAULT_INTERVAL - (time.monotonic() - sampler.previous_time)))
+            processes = sampler.sample()
+            if state_file:
+                sampler.save(state_file)
+            print_report(processes, float(argv[2]), float(argv[3]))
+            return 0
+        elif command == "top" and len(argv) <= 4:
+            key = argv[2] if len(argv) > 2 else "cpu"
+            limit = int(argv[3]) if len(argv) > 3 else 10
+            if key not in ("cpu", "rss"):
+                raise ValueError(f"unknown sort key: {key}")
+            sampler.sample()
+            time.sleep(DEFAULT_INTERVAL)
+            print(f"{'PID':>7} {'USER':<12} {'CPU%':>6} {'RSS':>10} COMMAND")
+            for process in top_processes(sampler.sample(), key, limit):
+                print(f"{process.pid:>7} {process.user:<12} {process.cpu:>6} {process.rss // 1024:>8}KB {process.command}")
+            return 0
+        elif command == "benchmark" and len(argv) <= 3:
+            iterations = int(argv[2]) if len(argv) > 2 else 20
+            count, cost = benchmark(iterations)
+            print(f"Sampled {count} processes, {cost:.2f} ms per 1000 processes")
+            return 0
+        elif command in ("help", "--help", "-h"):
+            display_help()
+            return 0
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    display_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -6,6 +6,9 @@
 # Date: $(date +%Y-%m-%d)
 # Description: This script monitors processes and can alert when thresholds are exceeded
 
+# Set script directory
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
 # Configuration
 CPU_THRESHOLD=80  # CPU usage percentage threshold
 MEM_THRESHOLD=80  # Memory usage percentage threshold
@@ -13,6 +16,8 @@ LOG_DIR="../logs"
 DATA_DIR="../data"
 TIMESTAMP=$(date +"%Y-%m-%d_%H-%M-%S")
 ALERT_LOG="$LOG_DIR/alerts_$TIMESTAMP.log"
+SAMPLER="$SCRIPT_DIR/proc_sampler.py"
+SAMPLER_STATE="$DATA_DIR/proc_sampler_state.json"
 
 # Create directories if they don't exist
 mkdir -p $LOG_DIR
@@ -24,18 +29,26 @@ log_message() {
     echo "$1"
 }
 
+# Function to sample all processes once for the CPU, memory and zombie checks
+collect_process_sample() {
+    log_message "Sampling processes..."
+    
+    # CPU usage is measured since the previous run (or over one second on the first run)
+    PROCESS_SAMPLE=$(python3 "$SAMPLER" report "$CPU_THRESHOLD" "$MEM_THRESHOLD" "$SAMPLER_STATE")
+}
+
 # Function to check CPU usage by process
 check_cpu_usage() {
     log_message "Checking for processes with high CPU usage..."
     
     # Get processes using more than the threshold CPU percentage
-    high_cpu_processes=$(ps aux | awk -v threshold=$CPU_THRESHOLD '$3 > threshold {print $0}')
+    high_cpu_processes=$(echo "$PROCESS_SAMPLE" | awk '$1 == "CPU"')
     
     if [ -n "$high_cpu_processes" ]; then
         {
             echo "=== HIGH CPU USAGE ALERT ==="
             echo "The following processes are using more than ${CPU_THRESHOLD}% CPU:"
-            echo "$high_cpu_processes" | awk '{print "PID: " $2 ", User: " $1 ", CPU: " $3 "%, Command: " $11}'
+            echo "$high_cpu_processes" | awk '{print "PID: " $2 ", User: " $3 ", CPU: " $4 "%, Command: " $6}'
             echo "================================"
         } | tee -a "$ALERT_LOG"
         
@@ -51,13 +64,13 @@ check_memory_usage() {
     log_message "Checking for processes with high memory usage..."
     
     # Get processes using more than the threshold memory percentage
-    high_mem_processes=$(ps aux | awk -v threshold=$MEM_THRESHOLD '$4 > threshold {print $0}')
+    high_mem_processes=$(echo "$PROCESS_SAMPLE" | awk '$1 == "MEM"')
     
     if [ -n "$high_mem_processes" ]; then
         {
             echo "=== HIGH MEMORY USAGE ALERT ==="
             echo "The following processes are using more than ${MEM_THRESHOLD}% memory:"
-            echo "$high_mem_processes" | awk '{print "PID: " $2 ", User: " $1 ", Memory: " $4 "%, Command: " $11}'
+            echo "$high_mem_processes" | awk '{print "PID: " $2 ", User: " $3 ", Memory: " $4 "%, Command: " $6}'
             echo "================================"
         } | tee -a "$ALERT_LOG"
         
@@ -73,13 +86,13 @@ check_zombie_processes() {
     log_message "Checking for zombie processes..."
     
     # Get zombie processes
-    zombie_processes=$(ps aux | awk '$8 ~ /Z/ {print $0}')
+    zombie_processes=$(echo "$PROCESS_SAMPLE" | awk '$1 == "ZOMBIE"')
     
     if [ -n "$zombie_processes" ]; then
         {
             echo "=== ZOMBIE PROCESSES ALERT ==="
             echo "The following zombie processes were detected:"
-            echo "$zombie_processes" | awk '{print "PID: " $2 ", User: " $1 ", State: " $8 ", Command: " $11}'
+            echo "$zombie_processes" | awk '{print "PID: " $2 ", User: " $3 ", State: " $5 ", Command: " $6}'
             echo "================================"
         } | tee -a "$ALERT_LOG"
         
@@ -127,6 +140,9 @@ monitor_processes() {
     # Initialize alert counter
     alerts=0
     
+    # Sample processes once for all checks
+    collect_process_sample
+    
     # Run all checks
     check_cpu_usage
     alerts=$((alerts + $?))
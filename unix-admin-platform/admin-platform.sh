@@ -6,7 +6,8 @@
 # Date: $(date +%Y-%m-%d)
 # Description: This script serves as the main entry point for the Unix System Administration Platform
 
-# Set script directory
+# Set script directory, remembering where we were called from for output paths
+CALLER_DIR="$PWD"
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 cd "$SCRIPT_DIR" || exit 1
 
@@ -117,11 +118,15 @@ ENABLE_WEB_INTERFACE=true
 # Security Settings
 ENABLE_SECURITY_SCANS=true
 SECURITY_SCAN_INTERVAL=3600  # seconds
+AUTH_LOG_FILES="/var/log/auth.log /var/log/secure"
+FAILED_LOGIN_WINDOW=24       # hours
+FAILED_LOGIN_THRESHOLD=10
 
 # Backup Settings
 BACKUP_DIRS="/etc /home /var/www"
 BACKUP_INTERVAL=86400  # seconds (daily)
 BACKUP_RETENTION=7     # days
+RESTORE_JOBS=4         # parallel archive extractions
 
 # Remote Management Settings
 ENABLE_REMOTE=false
@@ -329,6 +334,36 @@ run_backup() {
     return 0
 }
 
+# Function to generate a report from the monitoring history
+run_report() {
+    if [ ! -f "core/analytics.py" ]; then
+        print_error "Analytics script not found."
+        return 1
+    fi
+    
+    # Reports need NumPy, which is optional for the rest of the platform
+    if ! python3 -c "import numpy" &> /dev/null; then
+        print_error "Reports require the NumPy Python package (e.g. pip3 install numpy)."
+        return 1
+    fi
+    
+    # Write the report relative to the caller's directory, not the install directory
+    local args=("$@")
+    local output_index=""
+    case "$1" in
+        rollup) output_index=3 ;;
+        trends) output_index=2 ;;
+    esac
+    if [ -n "$output_index" ] && [ ${#args[@]} -gt "$output_index" ]; then
+        local output="${args[$output_index]}"
+        if [ "$output" != "-" ] && [[ "$output" != /* ]]; then
+            args[$output_index]="$CALLER_DIR/$output"
+        fi
+    fi
+    
+    python3 core/analytics.py "${args[@]}"
+}
+
 # Function to display help
 display_help() {
     print_header "Unix System Administration Platform"
@@ -346,6 +381,10 @@ display_help() {
     echo "  monitor       Run a system monitoring check"
     echo "  security      Run a security scan"
     echo "  backup        Run a backup"
+    echo "  report rollup hourly|daily [DAYS] [FILE]"
+    echo "                Percentile rollups of the monitoring history (CSV, or XLSX for *.xlsx)"
+    echo "  report trends [DAYS] [FILE]"
+    echo "                Disk fill trends and days until full per mountpoint"
     echo "  help          Display this help message"
     echo
 }
@@ -425,6 +464,10 @@ main() {
         backup)
             run_backup
             ;;
+        report)
+            shift
+            run_report "$@"
+            ;;
         help|--help|-h)
             display_help
             ;;
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+#
+# archive_index.py - Indexed backup archives for the Unix System Administration Platform
+#
+# Author: Your Name
+# Date: 2023-01-01
+# Description: This script writes tar archives as a sequence of independently
+#              gzipped blocks together with a member index, so that archive
+#              contents can be listed and single files restored without
+#              decompressing the whole archive.
+#
+# The archive itself is a plain multi-member gzip stream of a tar file, so
+# `tar -xzf` keeps working on it. The index is stored next to the archive as
+# <archive>.idx (gzipped JSON lines): a header line followed by one line per
+# member of the form [name, type, size, mtime, block_offset, block_skip,
+# linkname], where block_offset is the compressed offset of the gzip block
+# holding the member's tar header, block_skip is the header's offset inside
+# that block once decompressed and linkname is the target of hard links.
+
+import os
+import sys
+import gzip
+import json
+import zlib
+import shutil
+import fnmatch
+import tarfile
+
+# Index format version
+INDEX_VERSION = 1
+
+# Uncompressed size of each independently compressed block
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Compression level of the blocks, the one `tar -czf` (gzip -6) uses
+DEFAULT_COMPRESS_LEVEL = int(os.environ.get("BACKUP_COMPRESS_LEVEL", 6))
+
+# Size of reads from the compressed archive when extracting
+READ_CHUNK_SIZE = 64 * 1024
+
+# Map tarfile member types to the names used in the index
+MEMBER_TYPES = {
+    tarfile.REGTYPE: "file",
+    tarfile.AREGTYPE: "file",
+    tarfile.DIRTYPE: "dir",
+    tarfile.SYMTYPE: "symlink",
+    tarfile.LNKTYPE: "hardlink",
+}
+
+
+def index_path(archive_path):
+    """Return the path of the index belonging to an archive."""
+    return archive_path + ".idx"
+
+
+class BlockWriter:
+    """File-like object that gzips its input in independent blocks."""
+
+    def __init__(self, fileobj, block_size=DEFAULT_BLOCK_SIZE, compresslevel=DEFAULT_COMPRESS_LEVEL):
+        self.fileobj = fileobj
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        self.buffer = bytearray()
+        self.position = 0
+        self.block_offset = fileobj.tell()
+        self.block_start = 0
+
+    def write(self, data):
+        """Buffer data, flushing a gzip block whenever the buffer is full."""
+        self.buffer += data
+        self.position += len(data)
+        if len(self.buffer) >= self.block_size:
+            self.flush_block()
+        return len(data)
+
+    def tell(self):
+        """Return the uncompressed position of the stream."""
+        return self.position
+
+    def locate(self, position):
+        """Return (block_offset, block_skip) for an uncompressed position."""
+        return self.block_offset, position - self.block_start
+
+    def flush_block(self):
+        """Compress the buffered data as a standalone gzip member."""
+        if self.buffer:
+            self.fileobj.write(gzip.compress(bytes(self.buffer), self.compresslevel, mtime=0))
+            self.buffer = bytearray()
+        self.block_offset = self.fileobj.tell()
+        self.block_start = self.position
+
+    def close(self):
+        """Flush any remaining buffered data."""
+        self.flush_block()
+
+
+class BlockReader:
+    """File-like object that decompresses an archive from a block offset."""
+
+    def __init__(self, fileobj, block_offset, block_skip=0):
+        self.fileobj = fileobj
+        self.fileobj.seek(block_offset)
+        self.decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        self.buffer = b""
+        self.skip(block_skip)
+
+    def read(self, size=-1):
+        """Read up to size decompressed bytes."""
+        while size < 0 or len(self.buffer) < size:
+            chunk = self.fileobj.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            self.feed(chunk)
+
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def feed(self, chunk):
+        """Decompress a chunk, continuing across gzip member boundaries."""
+        while chunk:
+            self.buffer += self.decompressor.decompress(chunk)
+            if not self.decompressor.eof:
+                break
+            # Start the next block with whatever followed this one
+            chunk = self.decompressor.unused_data
+            self.decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+    def skip(self, count):
+        """Discard count decompressed bytes."""
+        while count > 0:
+            data = self.read(min(count, READ_CHUNK_SIZE))
+            if not data:
+                break
+            count -= len(data)
+
+
+class PaddedReader:
+    """File-like object that reads exactly size bytes of a file, padding with zeros."""
+
+    def __init__(self, fileobj, size, path):
+        self.fileobj = fileobj
+        self.path = path
+        self.remaining = size
+        self.missing = 0
+        self.failed = False
+
+    def read(self, size=-1):
+        """Read up to size bytes, making up for data the file no longer has."""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = b""
+        if not self.failed:
+            try:
+                data = self.fileobj.read(size)
+            except OSError as e:
+                print(f"Warning: cannot read {self.path}: {e}", file=sys.stderr)
+                self.failed = True
+        if len(data) < size:
+            # The file shrank or could not be read, the tar header already promised size bytes
+            self.missing += size - len(data)
+            data += bytes(size - len(data))
+        self.remaining -= size
+        return data
+
+
+def walk_paths(root):
+    """Yield every path below root (inclusive) in a stable order."""
+    yield root
+    if os.path.isdir(root) and not os.path.islink(root):
+        try:
+            entries = sorted(os.scandir(root), key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"Warning: cannot read directory {root}: {e}", file=sys.stderr)
+            return
+        for entry in entries:
+            yield from walk_paths(entry.path)
+
+
+def create_archive(archive_path, source_dir, block_size=DEFAULT_BLOCK_SIZE,
+                   compresslevel=DEFAULT_COMPRESS_LEVEL):
+    """Create an indexed archive of source_dir; return the number of errors."""
+    source_dir = os.path.abspath(source_dir)
+    parent = os.path.dirname(source_dir)
+    members = []
+    errors = 0
+
+    with open(archive_path, "wb") as f:
+        writer = BlockWriter(f, block_size, compresslevel)
+        with tarfile.open(fileobj=writer, mode="w", format=tarfile.PAX_FORMAT) as tar:
+            for path in walk_paths(source_dir):
+                arcname = os.path.relpath(path, parent)
+                try:
+                    tarinfo = tar.gettarinfo(path, arcname)
+                    if tarinfo is None:
+                        # Sockets and other unsupported file types
+                        continue
+                    source = open(path, "rb") if tarinfo.isreg() else None
+                except OSError as e:
+                    print(f"Warning: cannot archive {path}: {e}", file=sys.stderr)
+                    errors += 1
+                    continue
+
+                # Once the header is written the member must be completed, as GNU tar
+                # does, or every later member would be read from the wrong offset
+                block_offset, block_skip = writer.locate(tar.offset)
+                if source is None:
+                    tar.addfile(tarinfo)
+                else:
+                    with source:
+                        reader = PaddedReader(source, tarinfo.size, path)
+                        tar.addfile(tarinfo, reader)
+                    if reader.missing:
+                        print(f"Warning: {path}: file shrank by {reader.missing} bytes; padding with zeros",
+                              file=sys.stderr)
+                        errors += 1
+
+                members.append([
+                    tarinfo.name,
+                    MEMBER_TYPES.get(tarinfo.type, "other"),
+                    tarinfo.size,
+                    int(tarinfo.mtime),
+                    block_offset,
+                    block_skip,
+                    tarinfo.linkname if tarinfo.islnk() else None,
+                ])
+        writer.close()
+
+    # Write the index atomically so readers never see a partial one
+    temp_path = index_path(archive_path) + ".tmp"
+    with gzip.open(temp_path, "wt") as f:
+        f.write(json.dumps({"version": INDEX_VERSION, "block_size": block_size,
+                            "members": len(members)}) + "\n")
+        for member in members:
+            f.write(json.dumps(member) + "\n")
+    os.replace(temp_path, index_path(archive_path))
+
+    return errors
+
+
+def read_index(archive_path):
+    """Return the indexed members of an archive, or None if it has no index."""
+    try:
+        with gzip.open(index_path(archive_path), "rt") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != INDEX_VERSION:
+                return None
+            return [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError, EOFError):
+        return None
+
+
+def scan_members(archive_path):
+    """List the members of an unindexed archive by reading it in full."""
+    members = []
+    with tarfile.open(archive_path, "r:*") as tar:
+        for tarinfo in tar:
+            members.append([
+                tarinfo.name,
+                MEMBER_TYPES.get(tarinfo.type, "other"),
+                tarinfo.size,
+                int(tarinfo.mtime),
+                None,
+                None,
+                tarinfo.linkname if tarinfo.islnk() else None,
+            ])
+    return members
+
+
+def matches(name, patterns):
+    """Check if a member name matches any path or glob pattern."""
+    if not patterns:
+        return True
+    for pattern in patterns:
+        pattern = pattern.strip("/")
+        if name == pattern or name.startswith(pattern + "/"):
+            return True
+        if fnmatch.fnmatchcase(name, pattern):
+            return True
+    return False
+
+
+def list_members(archive_path, patterns=None):
+    """Return archive members matching patterns as dictionaries."""
+    members = read_index(archive_path)
+    indexed = members is not None
+    if not indexed:
+        members = scan_members(archive_path)
+
+    files = [
+        {"name": name, "type": member_type, "size": size, "mtime": mtime}
+        for name, member_type, size, mtime, *_ in members
+        if matches(name, patterns)
+    ]
+    return indexed, files
+
+
+def extract_tarinfo(tar, tarinfo, target_dir):
+    """Extract a single member; return True on success."""
+    try:
+        # The archives are written by backup.sh itself, so restore them like
+        # `tar -xzf` would: ownership, setuid bits and absolute symlinks included
+        if hasattr(tarfile, "fully_trusted_filter"):
+            tar.extract(tarinfo, target_dir, filter="fully_trusted")
+        else:
+            tar.extract(tarinfo, target_dir)
+        return True
+    except (OSError, KeyError, tarfile.TarError) as e:
+        print(f"Warning: cannot extract {tarinfo.name}: {e}", file=sys.stderr)
+        return False
+
+
+def extract_members(archive_path, target_dir, patterns):
+    """Extract members matching patterns; return the number extracted."""
+    members = read_index(archive_path)
+    if members is None:
+        # No index, fall back to a full sequential pass
+        extracted = 0
+        with tarfile.open(archive_path, "r:*") as tar:
+            for tarinfo in tar:
+                if matches(tarinfo.name, patterns):
+                    if extract_tarinfo(tar, tarinfo, target_dir):
+                        extracted += 1
+        return extracted
+
+    # Work out which members to read and the names to restore them under
+    locations = {}
+    wanted = {}
+    for name, member_type, _, _, block_offset, block_skip, linkname in members:
+        locations[name] = (block_offset, block_skip)
+        if not matches(name, patterns):
+            continue
+        if member_type == "hardlink" and not matches(linkname, patterns):
+            # The link target is not being restored, so restore its data instead
+            wanted.setdefault(linkname, []).append(name)
+        else:
+            wanted.setdefault(name, []).append(name)
+
+    # Group the wanted members by the block holding their header
+    blocks = {}
+    for name in wanted:
+        block_offset, block_skip = locations[name]
+        blocks.setdefault(block_offset, {})[name] = block_skip
+
+    extracted = 0
+    with open(archive_path, "rb") as f:
+        for block_offset in sorted(blocks):
+            remaining = blocks[block_offset]
+            first_skip = min(remaining.values())
+
+            # Decompress from the block and read members until all are found
+            reader = BlockReader(f, block_offset, first_skip)
+            with tarfile.open(fileobj=reader, mode="r|") as tar:
+                for tarinfo in tar:
+                    if tarinfo.name in remaining:
+                        del remaining[tarinfo.name]
+                        extracted += restore_member(tar, tarinfo, target_dir,
+                                                    wanted[tarinfo.name])
+                    if not remaining:
+                        break
+
+    return extracted
+
+
+def restore_member(tar, tarinfo, target_dir, names):
+    """Extract a member under each of the given names; return the number restored."""
+    tarinfo.name = names[0]
+    if not extract_tarinfo(tar, tarinfo, target_dir):
+        return 0
+
+    # The member data can only be read once from the stream, copy it for the rest
+    restored = 1
+    source = os.path.join(target_dir, names[0])
+    for name in names[1:]:
+        destination = os.path.join(target_dir, name)
+        try:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copy2(source, destination)
+            tar.chown(tarinfo, destination, False)
+            restored += 1
+        except (OSError, tarfile.TarError) as e:
+            print(f"Warning: cannot extract {name}: {e}", file=sys.stderr)
+    return restored
+
+
+def display_help():
+    """Print command line usage."""
+    print("Indexed archives for the Unix System Administration Platform")
+    print(f"Usage: {sys.argv[0]} [COMMAND]")
+    print()
+    print("Commands:")
+    print("  create ARCHIVE DIR                Create an indexed archive of DIR")
+    print("  list ARCHIVE [PATTERN...]         List archive members")
+    print("  extract ARCHIVE DIR PATTERN...    Extract matching members to DIR")
+    print()
+
+
+def main(argv):
+    """Run the command line interface."""
+    if len(argv) < 2:
+        display_help()
+        return 1
+
+    command, args = argv[1], argv[2:]
+    try:
+        if command == "create" and len(args) == 2:
+            errors = create_archive(args[0], args[1])
+            return 1 if errors else 0
+        elif command == "list" and len(args) >= 1:
+            _, files = list_members(args[0], args[1:])
+            for member in files:
+                print(f"{member['size']:>12} {member['name']}")
+            return 0
+        elif command == "extract" and len(args) >= 3:
+            os.makedirs(args[1], exist_ok=True)
+            extracted = extract_members(args[0], args[1], args[2:])
+            print(f"Extracted {extracted} members")
+            return 0 if extracted else 1
+        elif command in ("help", "--help", "-h"):
+            display_help()
+            return 0
+    except (OSError, tarfile.TarError, zlib.error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Error: Invalid command or arguments: {' '.join(argv[1:])}", file=sys.stderr)
+    display_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -16,6 +16,7 @@ LOG_DIR="logs"
 DATA_DIR="data"
 BACKUP_LOG="$LOG_DIR/backup.log"
 BACKUP_DIR="$DATA_DIR/backups"
+ARCHIVE_TOOL="backup/archive_index.py"
 
 # Create directories if they don't exist
 mkdir -p "$LOG_DIR"
@@ -53,14 +54,17 @@ read_config() {
         # Read backup settings from config
         BACKUP_DIRS=$(grep "BACKUP_DIRS=" "$CONFIG_FILE" | cut -d'"' -f2)
         BACKUP_RETENTION=$(grep "BACKUP_RETENTION=" "$CONFIG_FILE" | cut -d'=' -f2)
+        RESTORE_JOBS=$(grep "RESTORE_JOBS=" "$CONFIG_FILE" | cut -d'=' -f2 | awk '{print $1}')
         
         # Set defaults if not found
         BACKUP_DIRS=${BACKUP_DIRS:-"/etc /home /var/www"}
         BACKUP_RETENTION=${BACKUP_RETENTION:-7}  # 7 days
+        RESTORE_JOBS=${RESTORE_JOBS:-$(nproc)}
     else
         log_message "Configuration file not found, using default backup settings"
         BACKUP_DIRS="/etc /home /var/www"
         BACKUP_RETENTION=7
+        RESTORE_JOBS=$(nproc)
     fi
 }
 
@@ -95,8 +99,8 @@ create_backup() {
             # Create directory name (replace / with _)
             DIR_NAME=$(echo "$dir" | tr '/' '_')
             
-            # Create tar archive
-            tar -czf "$CURRENT_BACKUP_DIR/${DIR_NAME}.tar.gz" -C "$(dirname "$dir")" "$(basename "$dir")" 2>/dev/null
+            # Create indexed tar archive (readable by plain tar -xzf as well)
+            python3 "$ARCHIVE_TOOL" create "$CURRENT_BACKUP_DIR/${DIR_NAME}.tar.gz" "$dir" 2>/dev/null
             
             # Check if backup was successful
             if [ $? -eq 0 ]; then
@@ -136,6 +140,9 @@ create_backup() {
     # Save backup information
     echo "{\"timestamp\": \"$TIMESTAMP\", \"location\": \"$CURRENT_BACKUP_DIR\", \"directories\": \"$BACKUP_DIRS\"}" > "$DATA_DIR/last_backup_info.json"
     
+    # Publish the API snapshot of the new data
+    python3 web/snapshots.py publish backups
+    
     log_message "Backup completed successfully"
     return 0
 }
@@ -288,23 +295,91 @@ restore_backup() {
         return 1
     fi
     
-    # Extract each archive
-    echo "$ARCHIVES" | while read -r archive; do
-        log_message "Extracting $archive to $target_dir"
-        tar -xzf "$archive" -C "$target_dir"
-        
-        # Check if extraction was successful
-        if [ $? -eq 0 ]; then
-            log_message "Extraction of $archive completed successfully"
-        else
-            log_message "Extraction of $archive failed"
+    # Restore only the requested paths if any were given
+    if [ $# -gt 2 ]; then
+        shift 2
+        restore_paths "$target_dir" "$ARCHIVES" "$@"
+        return $?
+    fi
+    
+    # Extract archives in parallel, at most RESTORE_JOBS at a time
+    log_message "Extracting archives using up to $RESTORE_JOBS parallel jobs"
+    while read -r archive; do
+        while [ "$(jobs -rp | wc -l)" -ge "$RESTORE_JOBS" ]; do
+            wait -n
+        done
+        extract_archive "$archive" "$target_dir" &
+    done <<< "$ARCHIVES"
+    wait
+    
+    log_message "Restore completed"
+    return 0
+}
+
+# Function to extract a single archive in full
+extract_archive() {
+    local archive="$1"
+    local target_dir="$2"
+    
+    log_message "Extracting $archive to $target_dir"
+    tar -xzf "$archive" -C "$target_dir"
+    
+    # Check if extraction was successful
+    if [ $? -eq 0 ]; then
+        log_message "Extraction of $archive completed successfully"
+    else
+        log_message "Extraction of $archive failed"
+    fi
+}
+
+# Function to restore selected paths or glob patterns from a backup
+restore_paths() {
+    local target_dir="$1"
+    local archives="$2"
+    shift 2
+    
+    log_message "Restoring $* to $target_dir"
+    
+    # Only the blocks holding matching members are decompressed
+    RESTORED=0
+    while read -r archive; do
+        if python3 "$ARCHIVE_TOOL" extract "$archive" "$target_dir" "$@"; then
+            log_message "Restored matching files from $archive"
+            RESTORED=1
         fi
-    done
+    done <<< "$archives"
+    
+    if [ $RESTORED -eq 0 ]; then
+        log_message "No files matching $* found in backup"
+        return 1
+    fi
     
     log_message "Restore completed"
     return 0
 }
 
+# Function to list the files in a backup
+list_backup_files() {
+    local backup_id="$1"
+    shift
+    
+    # Check if backup exists
+    BACKUP_PATH="$BACKUP_DIR/$backup_id"
+    if [ ! -d "$BACKUP_PATH" ]; then
+        log_message "Backup $backup_id not found"
+        return 1
+    fi
+    
+    # Listing reads only the archive indexes
+    find "$BACKUP_PATH" -name "*.tar.gz" | sort | while read -r archive; do
+        echo "Archive: $(basename "$archive")"
+        python3 "$ARCHIVE_TOOL" list "$archive" "$@"
+        echo
+    done
+    
+    return 0
+}
+
 # Function to display help
 display_help() {
     echo "Backup System for Unix System Administration Platform"
@@ -313,7 +388,8 @@ display_help() {
     echo "Commands:"
     echo "  backup        Create a new backup"
     echo "  list          List available backups"
-    echo "  restore ID DIR  Restore backup ID to directory DIR"
+    echo "  files ID [PATTERN...]  List files in backup ID"
+    echo "  restore ID DIR [PATTERN...]  Restore backup ID to directory DIR"
     echo "  cleanup       Clean up old backups"
     echo "  help          Display this help message"
     echo
@@ -321,6 +397,7 @@ display_help() {
     echo "  $0 backup                         Create a new backup"
     echo "  $0 list                           List available backups"
     echo "  $0 restore 20230101_120000 /tmp/restore  Restore backup to /tmp/restore"
+    echo "  $0 restore 20230101_120000 /tmp/restore etc/ssh/sshd_config  Restore a single file"
     echo "  $0 cleanup                        Clean up old backups"
     echo
 }
@@ -338,13 +415,23 @@ main() {
         list)
             list_backups
             ;;
+        files)
+            if [ -z "$2" ]; then
+                echo "Error: Missing backup ID for files command"
+                display_help
+                exit 1
+            fi
+            shift
+            list_backup_files "$@"
+            ;;
         restore)
             if [ -z "$2" ] || [ -z "$3" ]; then
                 echo "Error: Missing arguments for restore command"
                 display_help
                 exit 1
             fi
-            restore_backup "$2" "$3"
+            shift
+            restore_backup "$@"
             ;;
         cleanup)
             cleanup_old_backups
@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+#
+# analytics.py - Historical monitoring analytics for the Unix System Administration Platform
+#
+# Author: Your Name
+# Date: 2023-01-01
+# Description: This script loads the monitoring history into NumPy arrays and
+#              computes hourly/daily percentile rollups per metric and
+#              mountpoint and linear disk fill trends, streaming the results
+#              out as CSV or XLSX.
+#
+# The history in data/monitoring_data.json is mirrored into a columnar cache
+# in data/analytics/ (raw time, series and value columns plus state.json with
+# the series names and the byte offset read up to), so every run only parses
+# the lines appended since the previous one. Reports read the columns through
+# memory maps in chunks of whole hours or days, keeping memory use bounded
+# however long the history is.
+
+import io
+import os
+import re
+import sys
+import csv
+import json
+import fcntl
+import zipfile
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+# Set paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+MONITORING_DATA = os.path.join(DATA_DIR, "monitoring_data.json")
+CACHE_DIR = os.path.join(DATA_DIR, "analytics")
+STATE_FILE = os.path.join(CACHE_DIR, "state.json")
+
+# State file format version
+STATE_VERSION = 1
+
+# Cache columns and their types
+COLUMNS = {"time": np.int64, "series": np.int32, "value": np.float64}
+
+# Bytes of history parsed at a time when updating the cache
+READ_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Rows processed at a time when computing reports
+CHUNK_ROWS = 1024 * 1024
+
+# Rollup periods in seconds
+PERIODS = {"hourly": 3600, "daily": 86400}
+
+# Percentiles computed by the rollups
+PERCENTILES = (50, 95, 99)
+
+# Load averages are stored as one series per field
+LOAD_FIELDS = ("load1", "load5", "load15")
+
+# Lines written by core/monitor.sh, parsed without the JSON decoder
+VALUE_PATTERN = re.compile(
+    rb'^\{"timestamp": "([0-9 :-]{19})", "type": "([a-z_]+)"'
+    rb'(?:, "filesystem": "[^"\n]*", "mountpoint": "([^"\n]*)")?, "value": (-?[0-9]+(?:\.[0-9]+)?)\}$', re.M)
+LOAD_PATTERN = re.compile(
+    rb'^\{"timestamp": "([0-9 :-]{19})", "type": "load", "load1": ([0-9]+(?:\.[0-9]+)?), '
+    rb'"load5": ([0-9]+(?:\.[0-9]+)?), "load15": ([0-9]+(?:\.[0-9]+)?), "cores": [0-9]+\}$', re.M)
+
+# Column headers of the reports
+ROLLUP_HEADER = ["period", "metric", "mountpoint", "samples", "mean", "min"] + \
+    [f"p{p}" for p in PERCENTILES] + ["max"]
+TRENDS_HEADER = ["mountpoint", "samples", "usage", "growth_per_day", "days_until_full", "full_date"]
+
+
+def empty_state():
+    """Return a fresh cache state."""
+    return {"version": STATE_VERSION, "inode": None, "offset": 0, "rows": 0, "series": []}
+
+
+def load_state(path=STATE_FILE):
+    """Load the cache state, starting over if it is missing or invalid."""
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+        if state.get("version") == STATE_VERSION:
+            return state
+    except (OSError, ValueError):
+        pass
+    return empty_state()
+
+
+def save_state(state, path=STATE_FILE):
+    """Atomically write the cache state."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+def column_path(name):
+    """Return the path of a cache column."""
+    return os.path.join(CACHE_DIR, name + ".bin")
+
+
+def series_id(state, index, metric, mountpoint=""):
+    """Return the id of a series, registering new series."""
+    key = (metric, mountpoint)
+    number = index.get(key)
+    if number is None:
+        number = index[key] = len(state["series"])
+        state["series"].append([metric, mountpoint])
+    return number
+
+
+def parse_lines(data, state, index):
+    """Parse complete history lines; return arrays of (timestamps, series ids, values)."""
+    # Lines in the format written by monitor.sh are matched in bulk
+    value_lines = VALUE_PATTERN.findall(data)
+    load_lines = LOAD_PATTERN.findall(data)
+    if len(value_lines) + len(load_lines) == data.count(b"\n"):
+        timestamps, ids, values = [], [], []
+        if value_lines:
+            fields = np.array(value_lines)
+            lookup = {(metric, mountpoint): series_id(state, index, metric.decode(), mountpoint.decode())
+                      for metric, mountpoint in sorted(set((line[1], line[2]) for line in value_lines))}
+            timestamps.append(fields[:, 0])
+            ids.append(np.array([lookup[line[1], line[2]] for line in value_lines], dtype=np.int32))
+            values.append(fields[:, 3])
+        if load_lines:
+            fields = np.array(load_lines)
+            for column, field in enumerate(LOAD_FIELDS, 1):
+                timestamps.append(fields[:, 0])
+                ids.append(np.full(len(fields), series_id(state, index, field), dtype=np.int32))
+                values.append(fields[:, column])
+        if not timestamps:
+            return [], [], []
+        return np.concatenate(timestamps), np.concatenate(ids), np.concatenate(values)
+
+    # Anything else goes through the JSON decoder line by line
+    timestamps, ids, values = [], [], []
+    for line in data.splitlines():
+        try:
+            record = json.loads(line)
+            timestamp = record["timestamp"]
+            if record.get("type") == "load":
+                fields = [(field, "", record[field]) for field in LOAD_FIELDS]
+            else:
+                fields = [(record["type"], record.get("mountpoint", ""), record["value"])]
+            for metric, mountpoint, value in fields:
+                value = float(value)
+                timestamps.append(timestamp)
+                ids.append(series_id(state, index, metric, mountpoint))
+                values.append(value)
+        except (ValueError, KeyError, TypeError):
+            continue
+    return timestamps, ids, values
+
+
+def append_rows(state, timestamps, ids, values):
+    """Append parsed rows to the cache columns in time order."""
+    try:
+        times = np.asarray(timestamps).astype("datetime64[s]").astype(np.int64)
+    except ValueError:
+        # A malformed timestamp, convert one by one and drop the bad rows
+        times = np.array([parse_time(timestamp) for timestamp in timestamps], dtype=np.int64)
+    series = np.asarray(ids, dtype=np.int32)
+    values = np.asarray(values).astype(np.float64)
+
+    valid = times >= 0
+    order = np.argsort(times[valid], kind="stable")
+    columns = {"time": times[valid][order], "series": series[valid][order],
+               "value": values[valid][order]}
+    for name, column in columns.items():
+        with open(column_path(name), "ab") as f:
+            column.tofile(f)
+    state["rows"] += len(order)
+
+
+def parse_time(timestamp):
+    """Return the epoch seconds of a timestamp, or -1 if it is invalid."""
+    try:
+        return int(np.datetime64(timestamp if isinstance(timestamp, str) else timestamp.decode(), "s")
+                   .astype(np.int64))
+    except ValueError:
+        return -1
+
+
+def reset_columns(state):
+    """Drop the cached rows so the history is loaded again from the start."""
+    # Unlinking keeps the data alive for readers that still have it mapped
+    for name in COLUMNS:
+        try:
+            os.unlink(column_path(name))
+        except FileNotFoundError:
+            pass
+    state.update(empty_state())
+
+
+def update(state, source=MONITORING_DATA):
+    """Load new history lines into the cache; return the number of rows added."""
+    try:
+        st = os.stat(source)
+    except OSError:
+        return 0
+
+    if state["inode"] != st.st_ino or st.st_size < state["offset"]:
+        # The history was replaced or truncated, mirror it again
+        reset_columns(state)
+    else:
+        # Drop rows appended after the last saved state, e.g. by an interrupted update
+        for name, dtype in COLUMNS.items():
+            size = state["rows"] * np.dtype(dtype).itemsize
+            if os.path.exists(column_path(name)) and os.path.getsize(column_path(name)) > size:
+                os.truncate(column_path(name), size)
+    state["inode"] = st.st_ino
+
+    index = {tuple(key): number for number, key in enumerate(state["series"])}
+    rows = state["rows"]
+    with open(source, "rb") as f:
+        f.seek(state["offset"])
+        pending = b""
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            # Partially written lines are left for the next update
+            data = pending + chunk
+            end = data.rfind(b"\n") + 1
+            data, pending = data[:end], data[end:]
+            if data:
+                append_rows(state, *parse_lines(data, state, index))
+                state["offset"] += len(data)
+    return state["rows"] - rows
+
+
+def refresh(source=MONITORING_DATA, path=STATE_FILE):
+    """Bring the cache up to date with the history and return its state."""
+    # Serialize concurrent updates on a lock next to the state file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        state = load_state(path)
+        update(state, source)
+        save_state(state, path)
+    return state
+
+
+def open_columns(state):
+    """Return the cached (time, series, value) columns as read-only memory maps."""
+    if not state["rows"]:
+        return tuple(np.empty(0, dtype=dtype) for dtype in COLUMNS.values())
+    return tuple(np.memmap(column_path(name), dtype=dtype, mode="r", shape=(state["rows"],))
+                 for name, dtype in COLUMNS.items())
+
+
+def iter_chunks(times, period, since=None):
+    """Yield (start, end) row ranges of about CHUNK_ROWS rows holding whole periods."""
+    start = 0
+    if since is not None:
+        start = int(np.searchsorted(times, since))
+    while start < len(times):
+        end = min(start + CHUNK_ROWS, len(times))
+        if end < len(times):
+            # Move the end back to the first row of the last period in the chunk
+            buckets = times[start:end] // period
+            split = np.flatnonzero(buckets != buckets[-1])
+            if len(split):
+                end = start + int(split[-1]) + 1
+        yield start, end
+        start = end
+
+
+def since_time(times, days):
+    """Return the first time included when reporting the last days, or None for all."""
+    if not days or not len(times):
+        return None
+    return int(times[-1]) - days * 86400
+
+
+def format_time(seconds):
+    """Format epoch seconds as a monitoring timestamp."""
+    return str(np.datetime64(int(seconds), "s")).replace("T", " ")
+
+
+def rollup_chunk(times, series, values, period):
+    """Compute the rollup of a chunk; return arrays of (bucket, series, count, mean, min, percentiles, max)."""
+    buckets = times // period
+    first = buckets.min()
+    nseries = int(series.max()) + 1
+    keys = (buckets - first) * nseries + series
+
+    # Sort by group, then by value, so percentiles are read at computed positions
+    order = np.lexsort((values, keys))
+    keys = keys[order]
+    values = values[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    counts = np.diff(np.append(starts, len(keys)))
+    lasts = starts + counts - 1
+
+    # Linear interpolation between the closest ranks, as numpy.percentile does
+    percentiles = []
+    for percentile in PERCENTILES:
+        position = starts + (counts - 1) * (percentile / 100)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, lasts)
+        fraction = position - lower
+        percentiles.append(values[lower] + (values[upper] - values[lower]) * fraction)
+
+    group_keys = keys[starts]
+    return ((group_keys // nseries + first) * period, group_keys % nseries, counts,
+            np.add.reduceat(values, starts) / counts, values[starts], percentiles, values[lasts])
+
+
+def rollups(state, period_name, days=0):
+    """Yield rollup rows per period, metric and mountpoint in time order."""
+    period = PERIODS[period_name]
+    times, series, values = open_columns(state)
+    for start, end in iter_chunks(times, period, since_time(times, days)):
+        buckets, ids, counts, means, minimums, percentiles, maximums = rollup_chunk(
+            np.asarray(times[start:end]), np.asarray(series[start:end]),
+            np.asarray(values[start:end]), period)
+        for i in range(len(buckets)):
+            metric, mountpoint = state["series"][ids[i]]
+            yield ([format_time(buckets[i]), metric, mountpoint, int(counts[i]),
+                    round(float(means[i]), 2), float(minimums[i])]
+                   + [round(float(p[i]), 2) for p in percentiles] + [float(maximums[i])])
+
+
+def disk_trends(state, days=30, full=100.0):
+    """Fit linear disk usage trends; return rows per mountpoint, fastest filling first."""
+    times, series, values = open_columns(state)
+    since = since_time(times, days)
+    nseries = len(state["series"])
+    origin = since if since is not None else (int(times[0]) if len(times) else 0)
+
+    # Least squares sums per series, accumulated chunk by chunk
+    sums = np.zeros((5, nseries))
+    last_time = np.full(nseries, -1, dtype=np.int64)
+    last_value = np.zeros(nseries)
+    for start, end in iter_chunks(times, PERIODS["daily"], since):
+        chunk_series = np.asarray(series[start:end])
+        chunk_times = np.asarray(times[start:end])
+        x = (chunk_times - origin) / 86400
+        y = np.asarray(values[start:end])
+        for row, weights in enumerate((None, x, y, x * x, x * y)):
+            sums[row] += np.bincount(chunk_series, weights, minlength=nseries)
+
+        # The last sample of each series in the chunk, rows are in time order
+        reversed_ids, reversed_index = np.unique(chunk_series[::-1], return_index=True)
+        last_index = len(chunk_series) - 1 - reversed_index
+        last_time[reversed_ids] = chunk_times[last_index]
+        last_value[reversed_ids] = y[last_index]
+
+    rows = []
+    for number, (metric, mountpoint) in enumerate(state["series"]):
+        n, sx, sy, sxx, sxy = sums[:, number]
+        if metric != "disk" or n < 2 or n * sxx - sx * sx <= 0:
+            continue
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        days_left = full_date = None
+        if slope > 0:
+            # Project from the fitted usage at the last sample
+            fitted = (sy - slope * sx) / n + slope * (last_time[number] - origin) / 86400
+            days_left = max(0.0, (full - fitted) / slope)
+            if days_left < 36500:
+                full_date = (datetime.strptime(format_time(last_time[number]), "%Y-%m-%d %H:%M:%S")
+                             + timedelta(days=days_left)).strftime("%Y-%m-%d")
+            days_left = round(days_left, 1)
+        rows.append([mountpoint, int(n), float(last_value[number]), round(slope, 3) + 0.0,
+                     days_left, full_date])
+
+    rows.sort(key=lambda row: (row[4] is None, row[4]))
+    return rows
+
+
+class XlsxWriter:
+    """Minimal streaming writer of single-table XLSX workbooks."""
+
+    # Rows per worksheet, including the header
+    MAX_ROWS = 1048576
+
+    def __init__(self, fileobj, header):
+        self.zip = zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED)
+        self.header = header
+        self.sheets = 0
+        self.sheet = None
+        self.rows = 0
+        self.buffer = []
+        self.start_sheet()
+
+    def start_sheet(self):
+        """Finish the current worksheet and start a new one with the header."""
+        self.finish_sheet()
+        self.sheets += 1
+        self.sheet = self.zip.open(f"xl/worksheets/sheet{self.sheets}.xml", "w", force_zip64=True)
+        self.sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         b'<sheetData>')
+        self.rows = 0
+        self.writerow(self.header)
+
+    def finish_sheet(self):
+        """Write out the buffered rows and close the current worksheet."""
+        if self.sheet is None:
+            return
+        self.flush()
+        self.sheet.write(b"</sheetData></worksheet>")
+        self.sheet.close()
+        self.sheet = None
+
+    def writerow(self, row):
+        """Add a row to the workbook."""
+        if self.rows == self.MAX_ROWS:
+            self.start_sheet()
+        self.rows += 1
+        cells = []
+        for value in row:
+            if value is None:
+                cells.append("<c/>")
+            elif isinstance(value, (int, float)):
+                cells.append(f"<c><v>{value}</v></c>")
+            else:
+                cells.append(f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>')
+        self.buffer.append(f"<row>{''.join(cells)}</row>")
+        if len(self.buffer) >= 1000:
+            self.flush()
+
+    def flush(self):
+        """Write out the buffered rows."""
+        if self.buffer:
+            self.sheet.write("".join(self.buffer).encode())
+            self.buffer = []
+
+    def close(self):
+        """Write the workbook structure and finish the file."""
+        self.finish_sheet()
+        sheets = range(1, self.sheets + 1)
+        self.zip.writestr("[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for i in sheets)
+            + "</Types>")
+        self.zip.writestr("_rels/.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="xl/workbook.xml" Type="http://schemas.openxmlformats.org/'
+            'officeDocument/2006/relationships/officeDocument"/></Relationships>')
+        self.zip.writestr("xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(f'<sheet name="Report{"" if i == 1 else i}" sheetId="{i}" r:id="rId{i}"/>'
+                      for i in sheets)
+            + "</sheets></workbook>")
+        self.zip.writestr("xl/_rels/workbook.xml.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(f'<Relationship Id="rId{i}" Target="worksheets/sheet{i}.xml" '
+                      'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+                      for i in sheets)
+            + "</Relationships>")
+        self.zip.close()
+
+
+def write_report(fileobj, header, rows, output_format="csv"):
+    """Stream report rows to a binary file object as CSV or XLSX."""
+    if output_format == "xlsx":
+        writer = XlsxWriter(fileobj, header)
+        for row in rows:
+            writer.writerow(row)
+        writer.close()
+        return
+
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="", write_through=False)
+    writer = csv.writer(text)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+    text.flush()
+    text.detach()
+
+
+def display_help():
+    """Print command line usage."""
+    print("Historical monitoring analytics for the Unix System Administration Platform")
+    print(f"Usage: {sys.argv[0]} [COMMAND]")
+    print()
+    print("Commands:")
+    print("  rollup hourly|daily [DAYS] [OUTPUT]  Percentiles per metric and mountpoint")
+    print("  trends [DAYS] [OUTPUT]               Disk fill trends and days until full")
+    print("  import                               Load new history into the cache")
+    print("  reset                                Drop the cache")
+    print()
+    print("DAYS limits the report to the most recent days of history (0: all; trends")
+    print("default to 30). Reports are written as CSV to OUTPUT, or to standard output")
+    print("if it is omitted or '-'; an OUTPUT ending in .xlsx is written as XLSX.")
+    print()
+
+
+def main(argv):
+    """Run the command line interface."""
+    command, args = (argv[1], argv[2:]) if len(argv) > 1 else ("help", [])
+    try:
+        if command == "rollup" and 1 <= len(args) <= 3 and args[0] in PERIODS:
+            days = int(args[1]) if len(args) > 1 else 0
+            header, rows = ROLLUP_HEADER, rollups(refresh(), args[0], days)
+            output = args[2] if len(args) > 2 else "-"
+        elif command == "trends" and len(args) <= 2:
+            days = int(args[0]) if args else 30
+            header, rows = TRENDS_HEADER, disk_trends(refresh(), days)
+            output = args[1] if len(args) > 1 else "-"
+        elif command == "import" and not args:
+            state = refresh()
+            print(f"Cached {state['rows']} samples in {len(state['series'])} series")
+            return 0
+        elif command == "reset" and not args:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            state = load_state()
+            reset_columns(state)
+            save_state(state)
+            return 0
+        elif command in ("help", "--help", "-h"):
+            display_help()
+            return 0
+        else:
+            display_help()
+            return 1
+
+        if output == "-":
+            write_report(sys.stdout.buffer, header, rows)
+        else:
+            output_format = "xlsx" if output.endswith(".xlsx") else "csv"
+            with open(output, "wb") as f:
+                write_report(f, header, rows, output_format)
+        return 0
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -364,6 +364,9 @@ main() {
     # Save monitoring summary
     echo "{\"timestamp\": \"$(date +"%Y-%m-%d %H:%M:%S")\", \"alerts\": $ALERTS}" > "$DATA_DIR/monitoring_summary.json"
     
+    # Publish the API snapshot of the new data
+    python3 web/snapshots.py publish monitoring
+    
     return $ALERTS
 }
 
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+#
+# watcher.py - Change notification for the Unix System Administration Platform
+#
+# Author: Your Name
+# Date: 2023-01-01
+# Description: This script watches the platform's data directories and calls
+#              registered listeners with the files that changed, using Linux
+#              inotify through ctypes and falling back to polling where
+#              inotify is not available.
+#
+# Directories are watched without recursion. A file counts as changed when it
+# is closed after writing, created, deleted, renamed or touched; changes are
+# coalesced until DEBOUNCE seconds pass without another one (or MAX_DELAY after
+# the first), so a script appending many lines triggers a single notification.
+# When the kernel event queue overflows, the watched directory itself is
+# reported, which every listener for a file in it treats as a change.
+
+import os
+import sys
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+import threading
+
+# inotify constants from <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Events reported for the files in a watched directory
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+# Header of an inotify event: watch descriptor, mask, cookie and name length
+EVENT_HEADER = struct.Struct("iIII")
+
+# Quiet period that ends a burst of changes, and the longest a burst is held back
+DEBOUNCE = 0.2
+MAX_DELAY = 2.0
+
+# Interval between directory scans when polling
+POLL_INTERVAL = 2.0
+
+
+class InotifyBackend:
+    """Reports changed paths from a Linux inotify instance."""
+
+    name = "inotify"
+
+    def __init__(self, paths):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+        self.watches = {}
+        for path in paths:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(error, os.strerror(error), path)
+            self.watches[wd] = path
+
+    def fileno(self):
+        """Return the descriptor that becomes readable when events are queued."""
+        return self.fd
+
+    def read(self):
+        """Return the set of paths with queued events."""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length]
+                offset += EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost, anything may have changed
+                    changed.update(self.watches.values())
+                elif wd in self.watches:
+                    name = name.rstrip(b"\0")
+                    path = self.watches[wd]
+                    changed.add(os.path.join(path, os.fsdecode(name)) if name else path)
+
+    def close(self):
+        """Release the inotify instance."""
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """Reports changed paths by comparing directory scans."""
+
+    name = "polling"
+
+    def __init__(self, paths, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.listings = {path: self.scan(path) for path in paths}
+
+    @staticmethod
+    def scan(path):
+        """Return {name: (mtime, size, inode)} for the entries of a directory."""
+        listing = {}
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    listing[entry.name] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            pass
+        return listing
+
+    def fileno(self):
+        """Polling has no descriptor to wait on."""
+        return None
+
+    def read(self):
+        """Rescan the directories; return the set of paths that changed."""
+        changed = set()
+        for path, previous in self.listings.items():
+            current = self.scan(path)
+            for name in previous.keys() | current.keys():
+                if previous.get(name) != current.get(name):
+                    changed.add(os.path.join(path, name))
+            self.listings[path] = current
+        return changed
+
+    def close(self):
+        """Nothing to release."""
+        pass
+
+
+def affects(changed, path):
+    """Check if a change to changed concerns a listener for path."""
+    # A change reported for a directory covers every file in it
+    return changed == path or os.path.dirname(changed) == path or os.path.dirname(path) == changed
+
+
+class Watcher:
+    """Watches directories and dispatches coalesced changes to listeners."""
+
+    def __init__(self, paths, polling=False):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.listeners = []
+        self.thread = None
+        self.stopped = threading.Event()
+        self.wakeup_read, self.wakeup_write = os.pipe()
+
+        self.backend = None
+        if not polling:
+            try:
+                self.backend = InotifyBackend(self.paths)
+            except (OSError, AttributeError) as e:
+                # AttributeError: the C library has no inotify functions
+                print(f"Warning: inotify not available ({e}), polling for changes", file=sys.stderr)
+        if self.backend is None:
+            self.backend = PollingBackend(self.paths)
+
+    @property
+    def method(self):
+        """Return the name of the notification method in use."""
+        return self.backend.name
+
+    def add_listener(self, callback, paths=None):
+        """Call callback(changed) with the changed paths concerning paths (default: all)."""
+        paths = [os.path.abspath(path) for path in paths] if paths else None
+        self.listeners.append((callback, paths))
+
+    def wait(self, timeout=None):
+        """Wait up to timeout seconds for changes; return the set of changed paths."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        while not changed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if (remaining is not None and remaining <= 0) or not self.sleep(remaining):
+                return changed
+            changed = self.backend.read()
+
+        # Coalesce the rest of the burst
+        held = time.monotonic() + MAX_DELAY
+        while time.monotonic() < held:
+            if not self.sleep(DEBOUNCE if self.backend.fileno() is not None else 0):
+                break
+            more = self.backend.read()
+            if not more:
+                break
+            changed |= more
+        return changed
+
+    def sleep(self, timeout):
+        """Block until the backend may have events or timeout; return False once stopped."""
+        if self.stopped.is_set():
+            return False
+        if self.backend.fileno() is None:
+            interval = self.backend.interval if timeout is None else min(timeout, self.backend.interval)
+            return not self.stopped.wait(interval)
+
+        try:
+            ready, _, _ = select.select([self.backend.fileno(), self.wakeup_read], [], [], timeout)
+        except InterruptedError:
+            return True
+        if self.wakeup_read in ready:
+            return False
+        return bool(ready)
+
+    def dispatch(self, changed):
+        """Call the listeners concerned by the changed paths."""
+        for callback, paths in self.listeners:
+            if paths is None:
+                selected = changed
+            else:
+                selected = {path for path in changed if any(affects(path, watched) for watched in paths)}
+            if not selected:
+                continue
+            try:
+                callback(selected)
+            except Exception as e:
+                print(f"Warning: change listener failed: {e}", file=sys.stderr)
+
+    def run(self):
+        """Dispatch changes until stopped."""
+        while not self.stopped.is_set():
+            changed = self.wait()
+            if changed:
+                self.dispatch(changed)
+
+    def start(self):
+        """Dispatch changes from a background thread."""
+        self.thread = threading.Thread(target=self.run, name="watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop dispatching and release the backend."""
+        self.stopped.set()
+        os.write(self.wakeup_write, b"\0")
+        if self.thread is not None:
+            self.thread.join()
+        self.backend.close()
+        os.close(self.wakeup_read)
+        os.close(self.wakeup_write)
+
+
+def display_help():
+    """Print command line usage."""
+    print("Change notification for the Unix System Administration Platform")
+    print(f"Usage: {sys.argv[0]} [COMMAND]")
+    print()
+    print("Commands:")
+    print("  wait SECONDS PATH...  Wait until one of the files or directories changes,")
+    print("                        for at most SECONDS (0: no limit), and print the")
+    print("                        changed paths")
+    print("  watch DIR...          Print changes in the directories until interrupted")
+    print()
+
+
+def main(argv):
+    """Run the command line interface."""
+    command, args = (argv[1], argv[2:]) if len(argv) > 1 else ("help", [])
+    try:
+        if command == "wait" and len(args) >= 2:
+            timeout = float(args[0]) or None
+            paths = [os.path.abspath(path) for path in args[1:]]
+
+            # Files are watched through their directory, so replacing them is noticed too
+            directories = sorted({path if os.path.isdir(path) else os.path.dirname(path) for path in paths})
+            watcher = Watcher(directories)
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                changed = {path for path in watcher.wait(remaining)
+                           if any(affects(path, watched) for watched in paths)}
+                if changed:
+                    print("\n".join(sorted(changed)))
+                    break
+            return 0
+        elif command == "watch" and args:
+            watcher = Watcher(args)
+            print(f"Watching {', '.join(watcher.paths)} ({watcher.method})", file=sys.stderr)
+            watcher.add_listener(lambda changed: print("\n".join(sorted(changed)), flush=True))
+            try:
+                watcher.run()
+            except KeyboardInterrupt:
+                pass
+            return 0
+        elif command in ("help", "--help", "-h"):
+            display_help()
+            return 0
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    display_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -17,6 +17,7 @@ DATA_DIR="data"
 SCHEDULER_LOG="$LOG_DIR/scheduler.log"
 SCHEDULER_PID_FILE="$DATA_DIR/scheduler.pid"
 SCHEDULER_TASKS_FILE="$DATA_DIR/scheduled_tasks.json"
+WATCHER_TOOL="core/watcher.py"
 
 # Create directories if they don't exist
 mkdir -p "$LOG_DIR"
@@ -198,6 +199,32 @@ check_tasks() {
     fi
 }
 
+# Function to wait until the next task is due or the task list changes
+wait_for_next_task() {
+    # Get current time
+    current_time=$(date +%s)
+    
+    # Find the earliest next run time of the enabled tasks
+    next_run=$(jq '[.tasks[] | select(.enabled == true) | (.last_run // 0) + .interval] | min // empty' "$SCHEDULER_TASKS_FILE" 2>/dev/null)
+    
+    # Wake up once an hour when there is nothing to schedule
+    if [ -z "$next_run" ]; then
+        delay=3600
+    else
+        delay=$((next_run - current_time))
+    fi
+    
+    # Tasks still due right after a check could not be run, retry them in a minute
+    if [ $delay -le 0 ]; then
+        delay=60
+    fi
+    
+    # Sleep until then, waking up early if tasks are added or changed
+    if ! python3 "$WATCHER_TOOL" wait "$delay" "$SCHEDULER_TASKS_FILE" > /dev/null; then
+        sleep "$delay"
+    fi
+}
+
 # Function to start the scheduler
 start_scheduler() {
     log_message "Starting task scheduler..."
@@ -229,8 +256,8 @@ start_scheduler() {
     # Main loop
     log_message "Entering main scheduler loop"
     while true; do
-        # Sleep for a minute
-        sleep 60
+        # Sleep until a task is due
+        wait_for_next_task
         
         # Check for tasks
         check_tasks
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+#
+# authlog.py - Incremental auth log analysis for the Unix System Administration Platform
+#
+# Author: Your Name
+# Date: 2023-01-01
+# Description: This script follows the system auth logs from a persisted byte
+#              cursor and keeps rolling per-IP counters of failed logins, so
+#              every scan only reads the lines written since the previous one.
+#
+# State is kept in data/authlog_state.json:
+#   cursors - per log file, the inode and byte offset read up to
+#   buckets - failed logins per hour (epoch seconds) and source address
+# Hourly buckets older than RETENTION_HOURS are dropped on every update.
+
+import os
+import re
+import sys
+import json
+import time
+import heapq
+import fcntl
+from datetime import datetime
+
+# Set paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+STATE_FILE = os.path.join(DATA_DIR, "authlog_state.json")
+
+# Auth logs followed by default (Debian/Ubuntu and RHEL/Fedora names)
+DEFAULT_LOG_FILES = ["/var/log/auth.log", "/var/log/secure"]
+
+# How long hourly counters are kept
+RETENTION_HOURS = 7 * 24
+
+# State file format version
+STATE_VERSION = 1
+
+# Lines reporting a failed login and the address it came from
+FAILED_MARKER = b"Failed password"
+SOURCE_PATTERN = re.compile(rb" from (\S+) port ")
+
+# Month abbreviations used by traditional syslog timestamps
+MONTHS = {month: index for index, month in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+     "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1)}
+
+
+def empty_state():
+    """Return a fresh analysis state."""
+    return {"version": STATE_VERSION, "cursors": {}, "buckets": {}}
+
+
+def load_state(path=STATE_FILE):
+    """Load the analysis state, starting over if it is missing or invalid."""
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+        if state.get("version") == STATE_VERSION:
+            return state
+    except (OSError, ValueError):
+        pass
+    return empty_state()
+
+
+def save_state(state, path=STATE_FILE):
+    """Atomically write the analysis state."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+def parse_timestamp(line, now):
+    """Return the epoch time of a syslog line, or now if it cannot be parsed."""
+    try:
+        if line[:4].isdigit():
+            # ISO 8601 timestamps (rsyslog high precision format)
+            return time.mktime(time.strptime(line[:19].decode(), "%Y-%m-%dT%H:%M:%S"))
+
+        # Traditional "Mmm dd HH:MM:SS" timestamps carry no year
+        month = MONTHS[line[:3].decode()]
+        day = int(line[4:6])
+        hour, minute, second = (int(part) for part in line[7:15].split(b":"))
+        current = datetime.fromtimestamp(now)
+        stamp = datetime(current.year, month, day, hour, minute, second)
+        if stamp.timestamp() > now + 86400:
+            # Entries from late December read in early January
+            stamp = stamp.replace(year=current.year - 1)
+        return stamp.timestamp()
+    except (KeyError, ValueError, UnicodeDecodeError):
+        return now
+
+
+def read_lines(path, offset, buckets, now):
+    """Count failed logins in path from offset; return the new offset."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                # Leave partially written lines for the next update
+                break
+            offset += len(line)
+
+            if FAILED_MARKER not in line:
+                continue
+            match = SOURCE_PATTERN.search(line)
+            if not match:
+                continue
+
+            hour = str(int(parse_timestamp(line, now) // 3600 * 3600))
+            source = match.group(1).decode(errors="replace")
+            counters = buckets.setdefault(hour, {})
+            counters[source] = counters.get(source, 0) + 1
+    return offset
+
+
+def find_rotated(path, inode):
+    """Find the rotated copy of a log file by its previous inode."""
+    for candidate in (path + ".1", path + ".0"):
+        try:
+            if os.stat(candidate).st_ino == inode:
+                return candidate
+        except OSError:
+            continue
+    return None
+
+
+def update(state, log_files=None, now=None):
+    """Read new lines from the auth logs into state; return the lines' byte count."""
+    now = now or time.time()
+    buckets = state["buckets"]
+    cursors = state["cursors"]
+    read = 0
+
+    for path in log_files or DEFAULT_LOG_FILES:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+
+        cursor = cursors.get(path)
+        offset = 0
+        if cursor and cursor["inode"] != st.st_ino:
+            # The log was rotated, finish the old file before starting the new one
+            rotated = find_rotated(path, cursor["inode"])
+            if rotated:
+                try:
+                    read += read_lines(rotated, cursor["offset"], buckets, now) - cursor["offset"]
+                except OSError:
+                    pass
+        elif cursor and st.st_size >= cursor["offset"]:
+            offset = cursor["offset"]
+        # Otherwise the log was truncated in place and is read from the start
+
+        try:
+            new_offset = read_lines(path, offset, buckets, now)
+        except OSError as e:
+            print(f"Warning: cannot read {path}: {e}", file=sys.stderr)
+            continue
+        read += new_offset - offset
+        cursors[path] = {"inode": st.st_ino, "offset": new_offset}
+
+    # Drop counters that fell out of the retention period
+    cutoff = now - RETENTION_HOURS * 3600
+    for hour in [hour for hour in buckets if int(hour) < cutoff]:
+        del buckets[hour]
+
+    return read
+
+
+def top_offenders(state, hours=24, limit=5, now=None):
+    """Return (total, [(address, count), ...]) for the last hours."""
+    now = now or time.time()
+    # Counters are hourly, so the window is the current, partial hour and the
+    # hours - 1 full hours before it; it never reaches further back than hours
+    cutoff = (now // 3600 - hours + 1) * 3600
+    totals = {}
+    for hour, counters in state["buckets"].items():
+        if int(hour) < cutoff:
+            continue
+        for source, count in counters.items():
+            totals[source] = totals.get(source, 0) + count
+
+    top = heapq.nlargest(limit, totals.items(), key=lambda item: item[1])
+    return sum(totals.values()), top
+
+
+def scan(log_files=None, hours=24, limit=5, path=STATE_FILE):
+    """Update the persisted state and return the top offenders."""
+    # Serialize concurrent scans on a lock next to the state file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        state = load_state(path)
+        update(state, log_files)
+        save_state(state, path)
+    return top_offenders(state, hours, limit)
+
+
+def reset(path=STATE_FILE):
+    """Forget all cursors and counters."""
+    # Hold the scan lock, or a running scan would save over the reset state
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        save_state(empty_state(), path)
+
+
+def display_help():
+    """Print command line usage."""
+    print("Incremental auth log analysis for the Unix System Administration Platform")
+    print(f"Usage: {sys.argv[0]} [COMMAND]")
+    print()
+    print("Commands:")
+    print("  scan HOURS LIMIT [LOG...]  Read new log lines, then print the number of")
+    print("                             failed logins in the last HOURS followed by")
+    print("                             the top LIMIT addresses as 'COUNT ADDRESS'")
+    print("  reset                      Forget all cursors and counters")
+    print()
+
+
+def main(argv):
+    """Run the command line interface."""
+    if len(argv) >= 4 and argv[1] == "scan":
+        try:
+            total, top = scan(argv[4:] or None, int(argv[2]), int(argv[3]))
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(total)
+        for source, count in top:
+            print(f"{count} {source}")
+        return 0
+    elif len(argv) == 2 and argv[1] == "reset":
+        try:
+            reset()
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        return 0
+    elif len(argv) == 2 and argv[1] in ("help", "--help", "-h"):
+        display_help()
+        return 0
+
+    display_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
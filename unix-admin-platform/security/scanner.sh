@@ -16,6 +16,7 @@ LOG_DIR="logs"
 DATA_DIR="data"
 SECURITY_LOG="$LOG_DIR/security.log"
 SECURITY_DATA="$DATA_DIR/security_data.json"
+AUTHLOG_TOOL="security/authlog.py"
 
 # Create directories if they don't exist
 mkdir -p "$LOG_DIR"
@@ -72,6 +73,21 @@ log_security_issue() {
     echo "{\"timestamp\": \"$(date +"%Y-%m-%d %H:%M:%S")\", \"severity\": \"$severity\", \"message\": \"$message\"}" >> "$SECURITY_DATA"
 }
 
+# Function to read configuration
+read_config() {
+    if [ -f "$CONFIG_FILE" ]; then
+        # Read failed login settings from config
+        AUTH_LOG_FILES=$(grep "AUTH_LOG_FILES=" "$CONFIG_FILE" | cut -d'"' -f2)
+        FAILED_LOGIN_WINDOW=$(grep "FAILED_LOGIN_WINDOW=" "$CONFIG_FILE" | cut -d'=' -f2 | awk '{print $1}')
+        FAILED_LOGIN_THRESHOLD=$(grep "FAILED_LOGIN_THRESHOLD=" "$CONFIG_FILE" | cut -d'=' -f2 | awk '{print $1}')
+    fi
+    
+    # Set defaults if not found
+    AUTH_LOG_FILES=${AUTH_LOG_FILES:-"/var/log/auth.log /var/log/secure"}
+    FAILED_LOGIN_WINDOW=${FAILED_LOGIN_WINDOW:-24}  # hours
+    FAILED_LOGIN_THRESHOLD=${FAILED_LOGIN_THRESHOLD:-10}
+}
+
 # Function to check for weak passwords
 check_weak_passwords() {
     log_message "Checking for weak passwords..."
@@ -341,24 +357,25 @@ check_ssh_config() {
 check_failed_logins() {
     log_message "Checking for failed login attempts..."
     
-    # Check auth.log for failed logins
-    if [ -f "/var/log/auth.log" ]; then
-        # Count failed SSH logins
-        FAILED_SSH=$(grep "Failed password" /var/log/auth.log | wc -l)
-        if [ "$FAILED_SSH" -gt 10 ]; then
-            log_security_issue "MEDIUM" "High number of failed SSH login attempts: $FAILED_SSH"
-            
-            # Get the top IP addresses
-            TOP_IPS=$(grep "Failed password" /var/log/auth.log | grep -oE "[0-9]+\.[0-9]+\.[0-9]+\.[0-9]+" | sort | uniq -c | sort -nr | head -5)
-            log_security_issue "MEDIUM" "Top IP addresses with failed login attempts:"
-            echo "$TOP_IPS" | while read -r line; do
-                log_security_issue "MEDIUM" "  - $line"
-            done
-        else
-            log_message "Normal number of failed SSH login attempts: $FAILED_SSH"
-        fi
+    # Only lines written since the last scan are read, counters are kept in the data directory
+    RESULT=$(python3 "$AUTHLOG_TOOL" scan "$FAILED_LOGIN_WINDOW" 5 $AUTH_LOG_FILES)
+    if [ $? -ne 0 ]; then
+        log_message "Auth log analysis failed, skipping failed login check"
+        return 0
+    fi
+    
+    # The first line is the total, followed by the top IP addresses
+    FAILED_SSH=$(echo "$RESULT" | head -1)
+    TOP_IPS=$(echo "$RESULT" | tail -n +2)
+    
+    if [ "$FAILED_SSH" -gt "$FAILED_LOGIN_THRESHOLD" ]; then
+        log_security_issue "MEDIUM" "High number of failed SSH login attempts in the last $FAILED_LOGIN_WINDOW hours: $FAILED_SSH"
+        log_security_issue "MEDIUM" "Top IP addresses with failed login attempts:"
+        echo "$TOP_IPS" | while read -r line; do
+            log_security_issue "MEDIUM" "  - $line"
+        done
     else
-        log_message "Auth log file not found"
+        log_message "Normal number of failed SSH login attempts in the last $FAILED_LOGIN_WINDOW hours: $FAILED_SSH"
     fi
 }
 
@@ -481,6 +498,9 @@ check_security_updates() {
 main() {
     log_message "Starting security scan..."
     
+    # Read configuration
+    read_config
+    
     # Initialize issue counter
     ISSUES=0
     
@@ -519,6 +539,9 @@ main() {
 }
 EOF
     
+    # Publish the API snapshot of the new data
+    python3 web/snapshots.py publish security
+    
     return $TOTAL_ISSUES
 }
 
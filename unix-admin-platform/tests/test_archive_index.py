@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+#
+# test_archive_index.py - Tests for the indexed backup archives
+#
+# Run with: python3 -m unittest discover tests
+
+import os
+import sys
+import stat
+import tarfile
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from io import StringIO
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backup"))
+import archive_index
+
+
+class ShrinkingFileTest(unittest.TestCase):
+    """A file that shrinks while it is archived must not corrupt the archive."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.source = os.path.join(self.temp_dir.name, "src")
+        os.makedirs(os.path.join(self.source, "a"))
+        for i in range(12):
+            with open(os.path.join(self.source, "a", f"f{i}"), "wb") as f:
+                f.write(f"file {i}\n".encode() * 10000)
+        self.archive = os.path.join(self.temp_dir.name, "src.tar.gz")
+
+    def create_with_shrinking(self, name, size):
+        """Create the archive, truncating name to size after it has been stat'ed."""
+        path = os.path.join(self.source, name)
+        gettarinfo = tarfile.TarFile.gettarinfo
+
+        def shrink_after_stat(tar, *args, **kwargs):
+            tarinfo = gettarinfo(tar, *args, **kwargs)
+            if tarinfo is not None and tarinfo.name == "src/" + name:
+                os.truncate(path, size)
+            return tarinfo
+
+        with mock.patch.object(tarfile.TarFile, "gettarinfo", shrink_after_stat), \
+                redirect_stderr(StringIO()) as stderr:
+            errors = archive_index.create_archive(self.archive, self.source, block_size=16 * 1024)
+        return errors, stderr.getvalue()
+
+    def test_shrunk_file_is_padded(self):
+        errors, warnings = self.create_with_shrinking("a/f1", 20000)
+        self.assertEqual(errors, 1)
+        self.assertIn("file shrank", warnings)
+
+        # The member keeps its declared size in the index and the archive
+        members = {name: size for name, _, size, *_ in archive_index.read_index(self.archive)}
+        self.assertEqual(members["src/a/f1"], 70000)
+        with tarfile.open(self.archive, "r:gz") as tar:
+            data = tar.extractfile("src/a/f1").read()
+        self.assertEqual(data, (b"file 1\n" * 10000)[:20000] + bytes(50000))
+
+    def test_members_after_shrunk_file_extract(self):
+        self.create_with_shrinking("a/f1", 20000)
+
+        # Members stored after the shrunk one are still found through the index
+        target = os.path.join(self.temp_dir.name, "restore")
+        names = ["src/a/f11", "src/a/f2", "src/a/f5"]
+        with redirect_stderr(StringIO()):
+            extracted = archive_index.extract_members(self.archive, target, names)
+        self.assertEqual(extracted, len(names))
+        for name in names:
+            number = name.rsplit("f", 1)[1]
+            with open(os.path.join(target, name), "rb") as f:
+                self.assertEqual(f.read(), f"file {number}\n".encode() * 10000)
+
+
+class RestoreMetadataTest(unittest.TestCase):
+    """Restoring selected members must keep what a full `tar -xzf` keeps."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.source = os.path.join(self.temp_dir.name, "src")
+        os.makedirs(self.source)
+
+        with open(os.path.join(self.source, "owned"), "w") as f:
+            f.write("owned\n")
+        with open(os.path.join(self.source, "setuid"), "w") as f:
+            f.write("setuid\n")
+        os.chmod(os.path.join(self.source, "setuid"), 0o4755)
+        os.symlink("/etc/localtime", os.path.join(self.source, "localtime"))
+        if os.geteuid() == 0:
+            os.chown(os.path.join(self.source, "owned"), 65534, 65534)
+
+        self.archive = os.path.join(self.temp_dir.name, "src.tar.gz")
+        with redirect_stderr(StringIO()):
+            archive_index.create_archive(self.archive, self.source)
+        self.target = os.path.join(self.temp_dir.name, "restore")
+
+    def restore(self, name):
+        with redirect_stderr(StringIO()):
+            extracted = archive_index.extract_members(self.archive, self.target, [name])
+        self.assertEqual(extracted, 1)
+        return os.path.join(self.target, name)
+
+    @unittest.skipUnless(os.geteuid() == 0, "restoring ownership needs root")
+    def test_ownership_is_kept(self):
+        st = os.stat(self.restore("src/owned"))
+        self.assertEqual((st.st_uid, st.st_gid), (65534, 65534))
+
+    def test_mode_bits_are_kept(self):
+        st = os.stat(self.restore("src/setuid"))
+        self.assertEqual(stat.S_IMODE(st.st_mode), 0o4755)
+
+    def test_absolute_symlink_is_restored(self):
+        self.assertEqual(os.readlink(self.restore("src/localtime")), "/etc/localtime")
+
+
+if __name__ == "__main__":
+    unittest.main()
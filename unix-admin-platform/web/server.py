@@ -7,12 +7,16 @@
 # Description: This script provides a web interface for the platform
 
 import os
+import re
 import sys
 import json
 import time
 import socket
+import threading
 import subprocess
+import socketserver
 from datetime import datetime
+from urllib.parse import urlparse, parse_qs
 from http.server import HTTPServer, BaseHTTPRequestHandler
 
 # Set paths
@@ -21,14 +25,116 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 LOG_DIR = os.path.join(BASE_DIR, "logs")
 CONFIG_DIR = os.path.join(BASE_DIR, "config")
 TEMPLATE_DIR = os.path.join(BASE_DIR, "web", "templates")
+BACKUP_DIR = os.path.join(DATA_DIR, "backups")
+
+# Make the platform's helper modules importable
+sys.path.insert(0, os.path.join(BASE_DIR, "backup"))
+sys.path.insert(0, os.path.join(BASE_DIR, "security"))
+import archive_index
+import authlog
+import snapshots
+
+# Reports need NumPy, which is optional
+sys.path.insert(0, os.path.join(BASE_DIR, "core"))
+import watcher
+try:
+    import analytics
+except ImportError:
+    analytics = None
+
+# The process sampler is shared with the system-monitor tool
+sys.path.insert(0, os.path.join(os.path.dirname(BASE_DIR), "system-monitor", "scripts"))
+try:
+    import proc_sampler
+    PROCESS_SAMPLER = proc_sampler.ProcessSampler()
+    # The sampler keeps the previous sample, requests are handled in several threads
+    PROCESS_SAMPLER_LOCK = threading.Lock()
+except ImportError:
+    PROCESS_SAMPLER = None
+
+# Backup directories are named after their creation time
+BACKUP_ID_PATTERN = re.compile(r"^[0-9]{8}_[0-9]{6}$|^latest$")
 
 # Ensure directories exist
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(LOG_DIR, exist_ok=True)
+os.makedirs(BACKUP_DIR, exist_ok=True)
 
 # Default port
 DEFAULT_PORT = 8080
 
+# Seconds between keep-alive comments on idle event streams
+EVENT_KEEPALIVE = 30
+
+# Change notification for the data directories, set up by run_server
+CHANGE_WATCHER = None
+
+
+def directory_size(path):
+    """Get the size of a directory in bytes."""
+    total_size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for f in filenames:
+            fp = os.path.join(dirpath, f)
+            if os.path.exists(fp):
+                total_size += os.path.getsize(fp)
+    return total_size
+
+
+class LiveUpdates:
+    """Broadcasts the names of changed data sets to event stream clients."""
+    
+    # Changes remembered for clients that fall behind
+    HISTORY = 100
+    
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.version = 0
+        self.changes = []
+    
+    def publish(self, topic):
+        """Announce that a data set changed."""
+        with self.condition:
+            self.version += 1
+            self.changes = self.changes[-self.HISTORY + 1:] + [(self.version, topic)]
+            self.condition.notify_all()
+    
+    def wait(self, since, timeout):
+        """Wait for changes after version since; return (version, changed topics)."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version > since, timeout)
+            if self.changes and self.changes[0][0] > since + 1:
+                # Some changes were forgotten, report every data set
+                return self.version, sorted(set(snapshots.SNAPSHOTS))
+            return self.version, sorted({topic for version, topic in self.changes if version > since})
+
+
+class BackupCatalog:
+    """List of backups and their sizes, rescanned only when backups change."""
+    
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = None
+    
+    def invalidate(self, changed=None):
+        """Drop the cached list."""
+        with self.lock:
+            self.entries = None
+    
+    def list(self):
+        """Return [(backup ID, size in bytes)], newest first."""
+        with self.lock:
+            # Without change notification the cached list cannot be trusted
+            if self.entries is None or CHANGE_WATCHER is None:
+                backups = sorted([d for d in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, d)) and d != "latest"], reverse=True)
+                self.entries = [(backup, directory_size(os.path.join(self.path, backup))) for backup in backups]
+            return self.entries
+
+
+LIVE_UPDATES = LiveUpdates()
+BACKUP_CATALOG = BackupCatalog(BACKUP_DIR)
+
 class AdminPlatformHandler(BaseHTTPRequestHandler):
     """HTTP request handler for the Admin Platform web interface."""
     
@@ -61,8 +167,18 @@ class AdminPlatformHandler(BaseHTTPRequestHandler):
             self.send_api_monitoring_data()
         elif self.path == "/api/security":
             self.send_api_security_data()
+        elif urlparse(self.path).path == "/api/security/logins":
+            self.send_api_failed_logins()
+        elif urlparse(self.path).path == "/api/processes":
+            self.send_api_processes()
+        elif urlparse(self.path).path == "/api/reports":
+            self.send_api_reports()
+        elif self.path == "/api/events":
+            self.send_api_events()
         elif self.path == "/api/backups":
             self.send_api_backup_data()
+        elif self.path.startswith("/api/backups/"):
+            self.send_api_backup_files()
         else:
             self.send_error(404, "File not found")
     
@@ -303,11 +419,9 @@ class AdminPlatformHandler(BaseHTTPRequestHandler):
         # Get list of backups
         backups_list = ""
         try:
-            backup_dir = os.path.join(DATA_DIR, "backups")
+            backup_dir = BACKUP_DIR
             if os.path.exists(backup_dir):
-                backups = sorted([d for d in os.listdir(backup_dir) if os.path.isdir(os.path.join(backup_dir, d)) and d != "latest"], reverse=True)
-                
-                for backup in backups:
+                for backup, size in BACKUP_CATALOG.list():
                     # Format timestamp
                     if len(backup) >= 15 and backup[8] == "_":
                         year = backup[0:4]
@@ -321,9 +435,7 @@ class AdminPlatformHandler(BaseHTTPRequestHandler):
                     else:
                         formatted_date = backup
                     
-                    # Get backup size
-                    backup_path = os.path.join(backup_dir, backup)
-                    size = self.get_directory_size(backup_path)
+                    # Format backup size
                     formatted_size = self.format_size(size)
                     
                     backups_list += f'<div class="backup">'
@@ -389,36 +501,217 @@ class AdminPlatformHandler(BaseHTTPRequestHandler):
     
     def send_api_monitoring_data(self):
         """Send monitoring data as JSON."""
-        # Get monitoring data
-        monitoring_data = self.get_monitoring_data()
+        self.send_snapshot("monitoring")
+    
+    def send_api_security_data(self):
+        """Send security data as JSON."""
+        self.send_snapshot("security")
+    
+    def send_api_failed_logins(self):
+        """Send the top failed login sources as JSON."""
+        # Parse ?hours=...&limit=...
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            hours = int(query.get("hours", ["24"])[0])
+            limit = int(query.get("limit", ["10"])[0])
+        except ValueError:
+            self.send_error(400, "Invalid hours or limit")
+            return
+        
+        # Counters are kept up to date by the security scanner
+        state = authlog.load_state()
+        total, top = authlog.top_offenders(state, hours, limit)
+        response = {
+            "hours": hours,
+            "total": total,
+            "top": [{"address": address, "count": count} for address, count in top]
+        }
         
         # Send response
         self.send_response(200)
         self.send_header("Content-type", "application/json")
         self.end_headers()
-        self.wfile.write(json.dumps(monitoring_data).encode())
+        self.wfile.write(json.dumps(response).encode())
     
-    def send_api_security_data(self):
-        """Send security data as JSON."""
-        # Get security data
-        security_data = self.get_security_data()
+    def send_api_processes(self):
+        """Send the top processes and zombies as JSON."""
+        if PROCESS_SAMPLER is None:
+            self.send_error(503, "Process sampler not available")
+            return
+        
+        # Parse ?sort=cpu|rss&limit=...
+        query = parse_qs(urlparse(self.path).query)
+        sort_key = query.get("sort", ["cpu"])[0]
+        try:
+            limit = int(query.get("limit", ["10"])[0])
+        except ValueError:
+            limit = -1
+        if sort_key not in ("cpu", "rss") or limit < 0:
+            self.send_error(400, "Invalid sort or limit")
+            return
+        
+        # CPU usage is measured since the previous request
+        with PROCESS_SAMPLER_LOCK:
+            if not PROCESS_SAMPLER.has_baseline:
+                PROCESS_SAMPLER.sample()
+                time.sleep(proc_sampler.DEFAULT_INTERVAL)
+            processes = PROCESS_SAMPLER.sample(proc_sampler.DEFAULT_INTERVAL)
+            interval = PROCESS_SAMPLER.interval
+        
+        response = {
+            "interval": round(interval, 2),
+            "total": len(processes),
+            "top": [p._asdict() for p in proc_sampler.top_processes(processes, sort_key, limit)],
+            "zombies": [p._asdict() for p in proc_sampler.zombie_processes(processes)]
+        }
         
         # Send response
         self.send_response(200)
         self.send_header("Content-type", "application/json")
         self.end_headers()
-        self.wfile.write(json.dumps(security_data).encode())
+        self.wfile.write(json.dumps(response).encode())
+    
+    def send_api_reports(self):
+        """Send a monitoring history report as JSON, CSV or XLSX."""
+        if analytics is None:
+            self.send_error(503, "Reports not available (NumPy is not installed)")
+            return
+        
+        # Parse ?report=hourly|daily|trends&days=...&format=json|csv|xlsx
+        query = parse_qs(urlparse(self.path).query)
+        report = query.get("report", ["daily"])[0]
+        output_format = query.get("format", ["json"])[0]
+        try:
+            days = int(query.get("days", ["30"])[0])
+        except ValueError:
+            days = -1
+        if report not in ("hourly", "daily", "trends") or output_format not in ("json", "csv", "xlsx") or days < 0:
+            self.send_error(400, "Invalid report, days or format")
+            return
+        
+        try:
+            state = analytics.refresh()
+        except OSError as e:
+            self.send_error(500, f"Cannot load monitoring history: {e}")
+            return
+        if report == "trends":
+            header, rows = analytics.TRENDS_HEADER, analytics.disk_trends(state, days)
+        else:
+            header, rows = analytics.ROLLUP_HEADER, analytics.rollups(state, report, days)
+        
+        if output_format == "json":
+            response = {
+                "report": report,
+                "days": days,
+                "rows": [dict(zip(header, row)) for row in rows]
+            }
+            self.send_response(200)
+            self.send_header("Content-type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps(response).encode())
+            return
+        
+        # Stream the file, the end of the response is marked by closing the connection
+        content_types = {
+            "csv": "text/csv",
+            "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        }
+        self.send_response(200)
+        self.send_header("Content-type", content_types[output_format])
+        self.send_header("Content-Disposition", f'attachment; filename="{report}_report.{output_format}"')
+        self.end_headers()
+        analytics.write_report(self.wfile, header, rows, output_format)
+    
+    def send_api_events(self):
+        """Stream data change notifications as server-sent events."""
+        self.send_response(200)
+        self.send_header("Content-type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        
+        # Each event lists the data sets that changed: monitoring, security or backups
+        version = LIVE_UPDATES.version
+        try:
+            while True:
+                version, topics = LIVE_UPDATES.wait(version, EVENT_KEEPALIVE)
+                if topics:
+                    self.wfile.write(f"event: change\ndata: {json.dumps(topics)}\n\n".encode())
+                else:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
     
     def send_api_backup_data(self):
         """Send backup data as JSON."""
-        # Get backup data
-        backup_data = self.get_backup_data()
+        self.send_snapshot("backups")
+    
+    def send_snapshot(self, name):
+        """Send a pre-serialized snapshot straight from its file."""
+        # Rebuild the snapshot if its data changed without it being published,
+        # with change notification this is done as soon as the data changes
+        if CHANGE_WATCHER is None and snapshots.is_stale(name):
+            try:
+                snapshots.publish(name)
+            except OSError as e:
+                self.log_message("Cannot publish %s snapshot: %s", name, e)
+        
+        # Serve the gzipped copy to clients that accept it
+        compressed = "gzip" in self.headers.get("Accept-Encoding", "")
+        try:
+            f = open(snapshots.snapshot_path(name, compressed), "rb")
+        except OSError:
+            self.send_error(500, "Snapshot not available")
+            return
+        
+        # Send response, the file is copied to the socket by the kernel
+        with f:
+            self.send_response(200)
+            self.send_header("Content-type", "application/json")
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.send_header("Vary", "Accept-Encoding")
+            if compressed:
+                self.send_header("Content-Encoding", "gzip")
+            self.end_headers()
+            self.connection.sendfile(f)
+    
+    def send_api_backup_files(self):
+        """Send the files contained in a backup as JSON."""
+        # Parse /api/backups/<id>/files?pattern=...
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 4 or parts[3] != "files":
+            self.send_error(404, "Endpoint not found")
+            return
+        
+        backup_id = parts[2]
+        if not BACKUP_ID_PATTERN.match(backup_id):
+            self.send_error(400, "Invalid backup ID")
+            return
+        
+        backup_path = os.path.join(BACKUP_DIR, backup_id)
+        if not os.path.isdir(backup_path):
+            self.send_error(404, "Backup not found")
+            return
+        
+        # Listing is served from the archive indexes, not the archives
+        patterns = parse_qs(url.query).get("pattern", [])
+        archives = []
+        for name in sorted(os.listdir(backup_path)):
+            if not name.endswith(".tar.gz"):
+                continue
+            try:
+                indexed, files = archive_index.list_members(os.path.join(backup_path, name), patterns)
+            except Exception as e:
+                archives.append({"archive": name, "error": str(e), "files": []})
+                continue
+            archives.append({"archive": name, "indexed": indexed, "files": files})
         
         # Send response
         self.send_response(200)
         self.send_header("Content-type", "application/json")
         self.end_headers()
-        self.wfile.write(json.dumps(backup_data).encode())
+        self.wfile.write(json.dumps({"backup": backup_id, "archives": archives}).encode())
     
     def run_monitor(self):
         """Run the monitoring script."""
@@ -530,83 +823,15 @@ class AdminPlatformHandler(BaseHTTPRequestHandler):
     
     def get_monitoring_data(self):
         """Get monitoring data."""
-        monitoring_data = {
-            "summary": {},
-            "cpu": [],
-            "memory": [],
-            "disk": [],
-            "load": [],
-            "zombies": []
-        }
-        
-        # Try to read monitoring summary
-        try:
-            with open(os.path.join(DATA_DIR, "monitoring_summary.json"), "r") as f:
-                monitoring_data["summary"] = json.load(f)
-        except:
-            pass
-        
-        # Try to read monitoring data
-        try:
-            if os.path.exists(os.path.join(DATA_DIR, "monitoring_data.json")):
-                with open(os.path.join(DATA_DIR, "monitoring_data.json"), "r") as f:
-                    for line in f:
-                        try:
-                            data = json.loads(line.strip())
-                            data_type = data.get("type")
-                            
-                            if data_type in monitoring_data:
-                                monitoring_data[data_type].append(data)
-                        except:
-                            pass
-        except:
-            pass
-        
-        return monitoring_data
+        return snapshots.build_monitoring_data()
     
     def get_security_data(self):
         """Get security data."""
-        security_data = {
-            "summary": {},
-            "issues": []
-        }
-        
-        # Try to read security summary
-        try:
-            with open(os.path.join(DATA_DIR, "security_summary.json"), "r") as f:
-                security_data["summary"] = json.load(f)
-        except:
-            pass
-        
-        # Try to read security data
-        try:
-            if os.path.exists(os.path.join(DATA_DIR, "security_data.json")):
-                with open(os.path.join(DATA_DIR, "security_data.json"), "r") as f:
-                    for line in f:
-                        try:
-                            data = json.loads(line.strip())
-                            security_data["issues"].append(data)
-                        except:
-                            pass
-        except:
-            pass
-        
-        return security_data
+        return snapshots.build_security_data()
     
     def get_backup_data(self):
         """Get backup data."""
-        backup_data = {
-            "last_backup": {}
-        }
-        
-        # Try to read last backup info
-        try:
-            with open(os.path.join(DATA_DIR, "last_backup_info.json"), "r") as f:
-                backup_data["last_backup"] = json.load(f)
-        except:
-            pass
-        
-        return backup_data
+        return snapshots.build_backup_data()
     
     def get_uptime(self):
         """Get system uptime."""
@@ -628,16 +853,6 @@ class AdminPlatformHandler(BaseHTTPRequestHandler):
         except:
             return "Unknown"
     
-    def get_directory_size(self, path):
-        """Get the size of a directory in bytes."""
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(path):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                if os.path.exists(fp):
-                    total_size += os.path.getsize(fp)
-        return total_size
-    
     def format_size(self, size_bytes):
         """Format size in bytes to human-readable format."""
         if size_bytes == 0:
@@ -762,11 +977,67 @@ class AdminPlatformHandler(BaseHTTPRequestHandler):
 """
 
 
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """HTTP server handling each request in a thread, so event streams do not block."""
+    daemon_threads = True
+
+
+def refresh_snapshot(name):
+    """Republish a snapshot after its data changed and notify event stream clients."""
+    # The collecting script has usually published the snapshot already,
+    # clients are notified either way
+    try:
+        if snapshots.is_stale(name):
+            snapshots.publish(name)
+    finally:
+        LIVE_UPDATES.publish(name)
+
+
+def refresh_backups(changed):
+    """Forget the backup list after backups changed and notify event stream clients."""
+    BACKUP_CATALOG.invalidate()
+    LIVE_UPDATES.publish("backups")
+
+
+def start_watcher():
+    """Watch the data directories and register the listeners for changes."""
+    global CHANGE_WATCHER
+    change_watcher = watcher.Watcher([DATA_DIR, BACKUP_DIR])
+    
+    # Snapshots are republished as soon as their source data changes
+    for name, (_, sources) in snapshots.SNAPSHOTS.items():
+        change_watcher.add_listener(lambda changed, name=name: refresh_snapshot(name),
+                                    [os.path.join(DATA_DIR, source) for source in sources])
+    
+    # Backups appear and disappear in BACKUP_DIR, a finished backup updates its info file
+    change_watcher.add_listener(refresh_backups, [BACKUP_DIR, os.path.join(DATA_DIR, "last_backup_info.json")])
+    
+    # Keep the report cache loaded with the latest monitoring history
+    if analytics is not None:
+        change_watcher.add_listener(lambda changed: analytics.refresh(), [analytics.MONITORING_DATA])
+    
+    # Catch up with changes made while the server was not running
+    for name in snapshots.SNAPSHOTS:
+        try:
+            if snapshots.is_stale(name):
+                snapshots.publish(name)
+        except OSError as e:
+            print(f"Warning: cannot publish {name} snapshot: {e}")
+    
+    change_watcher.start()
+    CHANGE_WATCHER = change_watcher
+    print(f"Watching {DATA_DIR} and {BACKUP_DIR} for changes ({change_watcher.method})")
+
+
 def run_server(port=DEFAULT_PORT):
     """Run the web server."""
     try:
         server_address = ('', port)
-        httpd = HTTPServer(server_address, AdminPlatformHandler)
+        httpd = ThreadingHTTPServer(server_address, AdminPlatformHandler)
+        try:
+            start_watcher()
+        except OSError as e:
+            print(f"Warning: cannot watch for data changes: {e}")
         print(f"Starting web server on port {port}...")
         httpd.serve_forever()
     except KeyboardInterrupt:
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+#
+# snapshots.py - Pre-serialized API snapshots for the Unix System Administration Platform
+#
+# Author: Your Name
+# Date: 2023-01-01
+# Description: This script builds the JSON payloads served by the web API and
+#              publishes them as snapshot files, so that the web server can
+#              send them without rebuilding and serializing them per request.
+#
+# Each snapshot is written as data/snapshots/<name>.json together with a
+# gzipped copy (<name>.json.gz). Both are written to a temporary file and
+# renamed into place, so readers always see a complete snapshot. The mtime
+# of a snapshot is set to that of its newest source data file at the time it
+# was built, so it is stale as soon as any source data file is newer.
+
+import os
+import sys
+import gzip
+import json
+import tempfile
+
+# Set paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+
+
+def build_monitoring_data():
+    """Get monitoring data."""
+    monitoring_data = {
+        "summary": {},
+        "cpu": [],
+        "memory": [],
+        "disk": [],
+        "load": [],
+        "zombies": []
+    }
+
+    # Try to read monitoring summary
+    try:
+        with open(os.path.join(DATA_DIR, "monitoring_summary.json"), "r") as f:
+            monitoring_data["summary"] = json.load(f)
+    except:
+        pass
+
+    # Try to read monitoring data
+    try:
+        if os.path.exists(os.path.join(DATA_DIR, "monitoring_data.json")):
+            with open(os.path.join(DATA_DIR, "monitoring_data.json"), "r") as f:
+                for line in f:
+                    try:
+                        data = json.loads(line.strip())
+                        data_type = data.get("type")
+
+                        if data_type in monitoring_data:
+                            monitoring_data[data_type].append(data)
+                    except:
+                        pass
+    except:
+        pass
+
+    return monitoring_data
+
+
+def build_security_data():
+    """Get security data."""
+    security_data = {
+        "summary": {},
+        "issues": []
+    }
+
+    # Try to read security summary
+    try:
+        with open(os.path.join(DATA_DIR, "security_summary.json"), "r") as f:
+            security_data["summary"] = json.load(f)
+    except:
+        pass
+
+    # Try to read security data
+    try:
+        if os.path.exists(os.path.join(DATA_DIR, "security_data.json")):
+            with open(os.path.join(DATA_DIR, "security_data.json"), "r") as f:
+                for line in f:
+                    try:
+                        data = json.loads(line.strip())
+                        security_data["issues"].append(data)
+                    except:
+                        pass
+    except:
+        pass
+
+    return security_data
+
+
+def build_backup_data():
+    """Get backup data."""
+    backup_data = {
+        "last_backup": {}
+    }
+
+    # Try to read last backup info
+    try:
+        with open(os.path.join(DATA_DIR, "last_backup_info.json"), "r") as f:
+            backup_data["last_backup"] = json.load(f)
+    except:
+        pass
+
+    return backup_data
+
+
+# Snapshot name -> (payload builder, source data files)
+SNAPSHOTS = {
+    "monitoring": (build_monitoring_data, ["monitoring_summary.json", "monitoring_data.json"]),
+    "security": (build_security_data, ["security_summary.json", "security_data.json"]),
+    "backups": (build_backup_data, ["last_backup_info.json"]),
+}
+
+
+def snapshot_path(name, compressed=False):
+    """Return the path of a snapshot file."""
+    return os.path.join(SNAPSHOT_DIR, name + (".json.gz" if compressed else ".json"))
+
+
+def write_atomic(path, content, version):
+    """Write content to path through a temporary file and a rename."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(temp_path, 0o644)
+        if version:
+            os.utime(temp_path, ns=(version, version))
+        os.replace(temp_path, path)
+    except:
+        os.unlink(temp_path)
+        raise
+
+
+def source_mtime(name):
+    """Return the mtime (ns) of the newest source data file of a snapshot."""
+    _, sources = SNAPSHOTS[name]
+    newest = 0
+    for source in sources:
+        try:
+            newest = max(newest, os.stat(os.path.join(DATA_DIR, source)).st_mtime_ns)
+        except OSError:
+            continue
+    return newest
+
+
+def publish(name):
+    """Build a snapshot and publish it with its gzipped copy."""
+    # Take the data version before reading, so changes made meanwhile are not missed
+    version = source_mtime(name)
+    builder, _ = SNAPSHOTS[name]
+    payload = json.dumps(builder()).encode()
+
+    # The gzipped copy goes first so it is never older than the plain one
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    for path, content in ((snapshot_path(name, compressed=True), gzip.compress(payload, mtime=0)),
+                          (snapshot_path(name), payload)):
+        write_atomic(path, content, version)
+
+
+def is_stale(name):
+    """Check if a snapshot is missing or older than its source data."""
+    try:
+        published = os.stat(snapshot_path(name)).st_mtime_ns
+    except OSError:
+        return True
+    return source_mtime(name) > published
+
+
+def display_help():
+    """Print command line usage."""
+    print("API snapshots for the Unix System Administration Platform")
+    print(f"Usage: {sys.argv[0]} publish [NAME...]")
+    print()
+    print(f"Snapshots: {', '.join(SNAPSHOTS)} (default: all)")
+    print()
+
+
+def main(argv):
+    """Run the command line interface."""
+    if len(argv) < 2 or argv[1] != "publish":
+        display_help()
+        return 1
+
+    names = argv[2:] or list(SNAPSHOTS)
+    for name in names:
+        if name not in SNAPSHOTS:
+            print(f"Error: Unknown snapshot: {name}", file=sys.stderr)
+            return 1
+        try:
+            publish(name)
+        except OSError as e:
+            print(f"Error: Cannot publish {name} snapshot: {e}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
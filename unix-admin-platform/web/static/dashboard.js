@@ -16,8 +16,36 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('run-monitor').addEventListener('click', runMonitor);
     document.getElementById('run-security').addEventListener('click', runSecurityScan);
     document.getElementById('run-backup').addEventListener('click', runBackup);
+    
+    // Reload data as soon as it changes on the server
+    subscribeToUpdates();
 });
 
+/**
+ * Subscribe to data change notifications from the server
+ */
+function subscribeToUpdates() {
+    if (!window.EventSource) {
+        return;
+    }
+    
+    const loaders = {
+        monitoring: loadMonitoringData,
+        security: loadSecurityData,
+        backups: loadBackupData
+    };
+    
+    // The browser reconnects automatically if the stream is interrupted
+    const events = new EventSource('/api/events');
+    events.addEventListener('change', function(event) {
+        JSON.parse(event.data).forEach(topic => {
+            if (loaders[topic]) {
+                loaders[topic]();
+            }
+        });
+    });
+}
+
 /**
  * Load monitoring data from the API
  */